@@ -0,0 +1,222 @@
+"""
+Benchmark of the latency lookup table build (build_latency_table.py), stage by stage.
+
+Each scale writes a synthetic dataset (SyntheticBenchmark, see
+latency_lookup_table/synthetic.py) to disk and runs the builder on it in its
+own process with `--stats`: the stage timings, throughput (models/s) and
+peak RSS are the builder's own, config files, result files (.json or
+.json.gz) and the per-model cache included.
+
+Throughputs depend on the machine, so the gate compares the ratio of the
+build throughput to a calibration workload timed in the same run (parsing
+reports with json). The run fails when the ratio of a scale falls below the
+floor stored in baseline.json, measured with the same build options
+(--workers, --no-cache, --compress, ...). Scales under `--gate-min-models` are only
+reported: they last a few milliseconds and are dominated by noise.
+
+    python benchmarks/bench_build_latency_table.py
+    python benchmarks/bench_build_latency_table.py --scales 10 1000 --update-baseline
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from latency_lookup_table.synthetic import SyntheticBenchmark, write_synthetic_dataset
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+BUILDER_PATH = os.path.join(REPO_DIR, "build_latency_table.py")
+
+DEFAULT_SCALES = (10, 1000, 100000)
+GATE_MIN_MODELS = 1000
+
+
+# calibration: the same pure-Python work on every machine
+
+def calibrate(seed: int, input_shape, n_reports: int = 20, repeat: int = 5, min_seconds: float = 0.2) -> float:
+    """ Reports parsed per second with json.loads, best of `repeat` runs """
+    generator = SyntheticBenchmark(input_shape=input_shape, seed=seed)
+    reports = [json.dumps(report) for _, _, report in generator.iter_models(n_reports)]
+
+    best = 0.0
+    for _ in range(repeat):
+        n_parsed = 0
+        start = time.perf_counter()
+        while True:
+            for report in reports:
+                json.loads(report)
+            n_parsed += len(reports)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                break
+        best = max(best, n_parsed / elapsed)
+    return best
+
+
+# one scale
+
+def get_dataset(data_dir: str, n_models: int, seed: int, input_shape, compress: bool):
+    """ (model dir, result dir) of the dataset, written unless a complete one is already there """
+    dataset_dir = os.path.join(data_dir, f"{n_models}-seed{seed}-{input_shape[0]}x{input_shape[1]}{'-gz' if compress else ''}")
+    model_dir, result_dir = os.path.join(dataset_dir, "models"), os.path.join(dataset_dir, "results")
+    done_path = os.path.join(dataset_dir, "done")
+    if not os.path.exists(done_path):
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        generator = SyntheticBenchmark(input_shape=input_shape, seed=seed)
+        write_synthetic_dataset(generator, n_models, model_dir, result_dir, compress=compress)
+        open(done_path, "w").close()
+    return model_dir, result_dir
+
+
+def run_scale(n_models: int, data_dir: str, args) -> dict:
+    input_shape = tuple(args.input_shape)
+    model_dir, result_dir = get_dataset(data_dir, n_models, args.seed, input_shape, args.compress)
+
+    # a fresh save dir: the cache (unless --no-cache) starts cold as in a first build
+    with tempfile.TemporaryDirectory() as save_dir:
+        stats_path = os.path.join(save_dir, "build_stats.json")
+        command = [
+            sys.executable, BUILDER_PATH,
+            "--model-dir", model_dir, "--result-dir", result_dir, "--save-dir", save_dir,
+            "--input-shape", *map(str, input_shape),
+            "--workers", str(args.workers),
+            "--stats", stats_path,
+        ]
+        if args.no_cache:
+            command.append("--no-cache")
+        subprocess.run(command, check=True, cwd=REPO_DIR, stdout=subprocess.DEVNULL)
+
+        with open(stats_path, "r") as f:
+            stats = json.load(f)
+
+    return {
+        "n_models": n_models,
+        "n_keys": stats["n_keys"],
+        "stages": {name: stage["seconds"] for name, stage in stats["stages"].items()},
+        "counters": stats["counters"],
+        "total": stats["wall_seconds"],
+        "models_per_sec": stats["models_per_sec"],
+        "peak_rss_kb": stats["peak_rss_kb"],
+        "peak_rss_workers_kb": stats.get("peak_rss_children_kb"),
+    }
+
+
+# report and baseline
+
+def print_result(result: dict):
+    print(f"{result['n_models']} models ({result['n_keys']} table keys): "
+          f"{result['total']:.3f}s, {result['models_per_sec']:.1f} models/s (ratio {result['ratio']:.4f}), "
+          f"peak RSS {result['peak_rss_kb'] / 1024:.1f} MiB, {result['counters'].get('bytes_read', 0) / 2 ** 20:.1f} MiB read")
+    total = sum(result["stages"].values())
+    for stage, seconds in result["stages"].items():
+        share = 100 * seconds / total if total else 0.0
+        print(f"    {stage:<20}{seconds:>10.3f}s {share:>5.1f}%")
+
+
+def get_options(args) -> dict:
+    """ Options of the build, the ratios of a baseline only hold for the same ones """
+    return {"input_shape": list(args.input_shape), "seed": args.seed, "workers": args.workers,
+            "cache": not args.no_cache, "compress": args.compress}
+
+
+def check_baseline(results, baseline: dict, options: dict, gate_min_models: int) -> bool:
+    if baseline.get("options", options) != options:
+        print(f"--   not gated: the baseline is measured with {baseline['options']}, this run with {options}")
+        return True
+
+    ok = True
+    for result in results:
+        n_models = result["n_models"]
+        floor = baseline.get("scales", {}).get(str(n_models), {}).get("min_ratio")
+        if n_models < gate_min_models:
+            print(f"--   {n_models} models: ratio {result['ratio']:.4f} (not gated, under {gate_min_models} models)")
+        elif floor is None:
+            print(f"--   {n_models} models: ratio {result['ratio']:.4f} (no baseline)")
+        elif result["ratio"] < floor:
+            print(f"FAIL {n_models} models: ratio {result['ratio']:.4f} < baseline {floor:.4f}")
+            ok = False
+        else:
+            print(f"ok   {n_models} models: ratio {result['ratio']:.4f} >= baseline {floor:.4f}")
+    return ok
+
+
+def update_baseline(results, baseline: dict, options: dict, margin: float, calibration: float) -> dict:
+    if baseline.get("options") != options:
+        baseline = {}
+    scales = baseline.setdefault("scales", {})
+    for result in results:
+        scales[str(result["n_models"])] = {
+            "min_ratio": round(result["ratio"] * (1 - margin), 6),
+            "measured_ratio": round(result["ratio"], 6),
+            # informative only, they depend on the machine
+            "measured_models_per_sec": result["models_per_sec"],
+            "peak_rss_kb": result["peak_rss_kb"],
+        }
+    baseline["options"] = options
+    baseline["margin"] = margin
+    baseline["measured_calibration"] = round(calibration, 1)
+    return baseline
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="numbers of models")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--input-shape", type=int, nargs=2, default=[160, 160], help="input shape of the models")
+    parser.add_argument("--workers", type=int, default=1, help="--workers of the builder")
+    parser.add_argument("--no-cache", action="store_true", help="build without the per-model cache")
+    parser.add_argument("--compress", action="store_true", help="save the benchmark results as .json.gz")
+    parser.add_argument("--data-dir", type=str, default=None, help="keep the generated datasets here and reuse them (default: temporary)")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help="throughput ratio floors per scale")
+    parser.add_argument("--update-baseline", action="store_true", help="store the measured ratios as the new floors")
+    parser.add_argument("--margin", type=float, default=0.3, help="floor = measured ratio * (1 - margin)")
+    parser.add_argument("--gate-min-models", type=int, default=GATE_MIN_MODELS, help="smaller scales are not gated")
+    parser.add_argument("--json", type=str, default=None, help="also save the results to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    calibration = calibrate(args.seed, tuple(args.input_shape))
+    print(f"Calibration: {calibration:.1f} reports parsed/s")
+
+    data_dir = args.data_dir if args.data_dir is not None else tempfile.mkdtemp(prefix="bench_lut_")
+    try:
+        results = []
+        for n_models in args.scales:
+            result = run_scale(n_models, data_dir, args)
+            result["ratio"] = result["models_per_sec"] / calibration
+            print_result(result)
+            results.append(result)
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"calibration": calibration, "results": results}, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(update_baseline(results, baseline, get_options(args), args.margin, calibration), f, indent=2)
+            f.write("\n")
+        print(f"Baseline is saved: {args.baseline}")
+    elif not check_baseline(results, baseline, get_options(args), args.gate_min_models):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
 import argparse
-import copy
 import os
 import json
 import yaml
 
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from typing import Iterator, List, Dict, Tuple
 
-from latency_lookup_table.helper import get_lookup_table_class, get_stats
+from latency_lookup_table.helper import LatencyStats, get_lookup_table_class, accumulate_stats, merge_stats, get_final_table
+from latency_lookup_table.alignment import LayerSpan, align_layers, get_latency_table
+from latency_lookup_table.benchmark_report import iter_node_latencies
+from latency_lookup_table.cache import ModelResultCache
+from latency_lookup_table.binary_table import save_binary_table
+from latency_lookup_table.cost_model import LatencyCostModel
+from latency_lookup_table.profiling import BuildProfiler
+from latency_lookup_table.tables import LatencyTable
+
+# The statistics are accumulated per shard of consecutive models, and the shards are merged in model order.
+# The shards do not depend on --workers or the cache, so neither does the final table.
+STATS_SHARD_SIZE = 64
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -17,15 +29,128 @@ def parse_args():
     parser.add_argument("--model-type", type=str, default=".tflite", help="model file type")
     parser.add_argument("--input-shape", type=int, nargs=2, default=[160, 160], help="input shape of the model")
 
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used to analyze benchmark results")
+
+    parser.add_argument("--no-cache", action="store_true", help="re-analyze every model instead of reusing cached per-model results")
+
+    parser.add_argument("--profile", action="store_true", help="report wall time per stage, models/s, ETA and peak RSS")
+    parser.add_argument("--stats", type=str, default=None, help="save the build profile as JSON to this file (implies --profile)")
+
     parser.add_argument("--save-dir", type=str, default="./.lut/", help="save directory for latency table")
     return parser.parse_args()
 
 
-def get_ops_from_benchmark(benchmark_file_path: str):
-    with open(benchmark_file_path, "r") as f:
-        benchmark = json.load(f)
+def get_result_path(result_dir: str, result_file: str) -> str:
+    # results downloaded with compression are saved as '.json.gz'
+    result_path = os.path.join(result_dir, result_file)
+    if not os.path.exists(result_path) and os.path.exists(result_path + ".gz"):
+        return result_path + ".gz"
+    return result_path
+
+
+def get_model_layer_spans(table_builder: LatencyTable, config_path: str, result_path: str, profiler: BuildProfiler = None) -> List[LayerSpan]:
+    profiler = BuildProfiler(enabled=False) if profiler is None else profiler
+
+    with profiler.stage("load_config"):
+        with open(config_path, "r") as f:
+            config = json.load(f)
+    
+    with profiler.stage("get_table_key_list"):
+        table_key_list = table_builder.get_table_key_list(config)
+    with profiler.stage("get_opcode"):
+        layer_to_ops = table_builder.get_opcode(table_key_list)
+
+    # nodes are parsed lazily, the file is closed once the last layer is matched
+    with profiler.stage("align"):
+        with closing(iter_node_latencies(result_path)) as nodes:
+            layer_spans = align_layers(table_key_list, layer_to_ops, nodes)
+
+    if profiler.enabled:
+        # whole file sizes (compressed for .gz), the parsing of a result may stop before its end
+        profiler.count("bytes_read", os.path.getsize(config_path) + os.path.getsize(result_path))
+    return layer_spans
+
+
+def get_model_latency_table(table_builder: LatencyTable, config_path: str, result_path: str, profiler: BuildProfiler = None) -> Dict[str, float]:
+    return get_latency_table(get_model_layer_spans(table_builder, config_path, result_path, profiler))
+
+
+# each worker process builds its own table builder once, instead of receiving it with every task
+_worker_table_builder = None
+_worker_profiler = None
+
+def _init_worker(model_class: str, input_shape: Tuple[int, int], profile: bool = False):
+    global _worker_table_builder, _worker_profiler
+    _worker_table_builder = get_lookup_table_class(model_class)(input_shape=input_shape)
+    _worker_profiler = BuildProfiler(enabled=profile)
 
-    return benchmark['benchmark']['info']['graphs'][0]['nodes']
+
+def _get_model_latency_table_worker(paths: Tuple[str, str]) -> Tuple[Dict[str, float], dict]:
+    # the stages timed in the worker are sent back with the result
+    model_latency_table = get_model_latency_table(_worker_table_builder, *paths, _worker_profiler)
+    return model_latency_table, _worker_profiler.pop()
+
+
+def _get_shard_stats_worker(shard_paths: List[Tuple[str, str]]) -> Tuple[Dict[str, LatencyStats], dict]:
+    # only the statistics of the shard are sent back, not the table of each model
+    stats = accumulate_stats(
+        get_model_latency_table(_worker_table_builder, config_path, result_path, _worker_profiler)
+        for config_path, result_path in shard_paths)
+    return stats, _worker_profiler.pop()
+
+
+def iter_shard_stats(args, model_names: List[str], model_paths: List[Tuple[str, str]], profiler: BuildProfiler = None) -> Iterator[Dict[str, LatencyStats]]:
+    """ Statistics of each shard of STATS_SHARD_SIZE models, analyzed by the worker processes """
+    profiler = BuildProfiler(enabled=False) if profiler is None else profiler
+
+    starts = range(0, len(model_paths), STATS_SHARD_SIZE)
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.model_class, args.input_shape, profiler.enabled),
+    ) as executor:
+        profiler.workers_started()
+        for start, (shard_stats, worker_profile) in zip(
+            starts,
+            executor.map(_get_shard_stats_worker, [model_paths[start:start + STATS_SHARD_SIZE] for start in starts]),
+        ):
+            profiler.merge(worker_profile)
+            for result_file in model_names[start:start + STATS_SHARD_SIZE]:
+                print(profiler.format_progress(result_file) if profiler.enabled else f"{result_file} is processed")
+                profiler.model_done()
+            yield shard_stats
+
+
+def iter_model_latency_tables(args, model_names: List[str], model_paths: List[Tuple[str, str]], profiler: BuildProfiler = None) -> Iterator[Dict[str, float]]:
+    profiler = BuildProfiler(enabled=False) if profiler is None else profiler
+
+    if args.workers > 1:
+        # Executor.map() keeps the input order, so the final table is identical to the serial run
+        chunksize = max(1, len(model_paths) // (args.workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(args.model_class, args.input_shape, profiler.enabled),
+        ) as executor:
+            profiler.workers_started()
+            for result_file, (model_latency_table, worker_profile) in zip(
+                model_names,
+                executor.map(_get_model_latency_table_worker, model_paths, chunksize=chunksize),
+            ):
+                profiler.merge(worker_profile)
+                print(profiler.format_progress(result_file) if profiler.enabled else f"{result_file} is processed")
+                yield model_latency_table
+    else:
+        lookup_table_class = get_lookup_table_class(args.model_class)
+        table_builder = lookup_table_class(input_shape=args.input_shape)
+
+        for result_file, (config_path, result_path) in zip(model_names, model_paths):
+            if not profiler.enabled:
+                print(f"{result_file} is being processed")
+            model_latency_table = get_model_latency_table(table_builder, config_path, result_path, profiler)
+            if profiler.enabled:
+                print(profiler.format_progress(result_file))
+            yield model_latency_table
 
 
 def main():
@@ -33,56 +158,101 @@ def main():
 
     args.input_shape = tuple(args.input_shape)
 
+    profiler = BuildProfiler(enabled=args.profile or args.stats is not None)
+
     model_files   = [model_file for model_file in os.listdir(args.model_dir) if model_file.endswith(args.model_type)]
     model_configs = [model_file.replace(args.model_type, ".json") for model_file in model_files]
-    benchmarked_results = [result_file for result_file in os.listdir(args.result_dir) if result_file.endswith(".json")]
+    benchmarked_results = [result_file for result_file in os.listdir(args.result_dir) if result_file.endswith((".json", ".json.gz"))]
 
     print(f"Found {len(model_configs)} model configs")
     print(f"Found {len(benchmarked_results)} benchmarked models")
 
     print(f'Warning: model config(.json) file name should be same as benchmarked result(.json) file name')
 
-    lookup_table_class = get_lookup_table_class(args.model_class)
-    table_builder = lookup_table_class(input_shape=args.input_shape)
+    model_paths = [
+        (os.path.join(args.model_dir, result_file), get_result_path(args.result_dir, result_file))
+        for result_file in model_configs
+    ]
 
-    lookup_table_list = []
+    pending = list(range(len(model_paths)))
 
-    for result_file in model_configs:
-        print(f"{result_file} is being processed")
+    cache = None
+    if not args.no_cache:
+        cache = ModelResultCache(os.path.join(args.save_dir, "cache"), args.model_class, args.input_shape)
+        with profiler.stage("cache_lookup"):
+            cache_keys = [cache.get_key(config_path, result_path) for config_path, result_path in model_paths]
 
-        with open(os.path.join(args.model_dir, result_file), "r") as f:
-            config = json.load(f)
-        
-        table_key_list = table_builder.get_table_key_list(config)
-        layer_to_ops = table_builder.get_opcode(table_key_list)
+            pending = [idx for idx, cache_key in enumerate(cache_keys) if not cache.contains(cache_key)]
+        print(f"Found {len(model_paths) - len(pending)} cached results, {len(pending)} models to process")
+
+    profiler.start(len(model_paths))
+    profiler.count("models_processed", len(pending))
 
-        ops_infos = get_ops_from_benchmark(os.path.join(args.result_dir, result_file))
-        ops_infos.reverse()    # for pop() operation
+    stats = {}
+    if cache is None and args.workers > 1:
+        # nothing to cache: the workers send the statistics of whole shards instead of the table of each model
+        for shard_stats in iter_shard_stats(args, model_configs, model_paths, profiler):
+            with profiler.stage("get_stats"):
+                merge_stats(stats, shard_stats)
+    else:
+        model_latency_tables = iter_model_latency_tables(
+            args,
+            [model_configs[idx] for idx in pending],
+            [model_paths[idx] for idx in pending],
+            profiler,
+        )
+        pending = set(pending)
 
-        model_latency_table = {}
+        shard_stats = {}
+        for idx in range(len(model_paths)):
+            if idx not in pending:
+                with profiler.stage("cache_load"):
+                    model_latency_table = cache.load(cache_keys[idx])
+                if model_latency_table is None:     # entry removed or corrupted since contains()
+                    print(f"{model_configs[idx]} is being processed")
+                    model_latency_table = get_model_latency_table(
+                        get_lookup_table_class(args.model_class)(input_shape=args.input_shape), *model_paths[idx], profiler)
+                    cache.save(cache_keys[idx], model_latency_table)
+            else:
+                model_latency_table = next(model_latency_tables)
+                if cache is not None:
+                    with profiler.stage("cache_save"):
+                        cache.save(cache_keys[idx], model_latency_table)
 
-        for layer in table_key_list:
-            layer_ops = copy.deepcopy(layer_to_ops[layer])
-            layer_latency = 0.0
+            with profiler.stage("get_stats"):
+                accumulate_stats([model_latency_table], shard_stats)
+                if (idx + 1) % STATS_SHARD_SIZE == 0 or idx + 1 == len(model_paths):
+                    merge_stats(stats, shard_stats)
+                    shard_stats = {}
+            profiler.model_done()
+        # the worker processes exit here, so that their peak RSS is known
+        model_latency_tables.close()
 
-            while len(layer_ops) != 0:
-                op_info = ops_infos.pop()
-                op_name = op_info["description"]
-                op_latency = op_info["exec_time"]["duration_ms"]
+    if cache is not None:
+        with profiler.stage("cache_save"):
+            cache.flush()
+    
+    with profiler.stage("get_stats"):
+        final_lookup_table = get_final_table(stats)
 
-                layer_latency += op_latency
-                if op_name == layer_ops[0]:
-                    layer_ops.pop(0)
+    with profiler.stage("save_yaml"):
+        with open(os.path.join(args.save_dir, "final_lookup_table.yaml"), "w") as f:
+            yaml.dump(final_lookup_table, f, default_flow_style=False)
 
-            model_latency_table[layer] = round(layer_latency, 4)
+    with profiler.stage("save_binary"):
+        save_binary_table(final_lookup_table, os.path.join(args.save_dir, "final_lookup_table.bin"))
 
-        lookup_table_list.append(model_latency_table)
-    
-    final_lookup_table = get_stats(lookup_table_list)
+    # estimates layers that are missing from the table at search time
+    with profiler.stage("cost_model"):
+        LatencyCostModel.fit(final_lookup_table).save(os.path.join(args.save_dir, "cost_model.json"))
 
-    with open(os.path.join(args.save_dir, "final_lookup_table.yaml"), "w") as f:
-        yaml.dump(final_lookup_table, f, default_flow_style=False)
+    if profiler.enabled:
+        profiler.stop()
+        profiler.print_summary()
+    if args.stats is not None:
+        profiler.save(args.stats, workers=args.workers, cache=not args.no_cache, n_keys=len(final_lookup_table))
+        print(f"Build profile is saved: {args.stats}")
                 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,47 @@
+import argparse
+
+from latency_lookup_table.synthetic import LATENCY_DISTRIBUTIONS, SyntheticBenchmark, write_synthetic_dataset
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-models", type=int, default=1000, help="number of (model config, benchmark result) pairs")
+    parser.add_argument("--model-dir", type=str, default="./.models/", help="save directory for model configs")
+    parser.add_argument("--result-dir", type=str, default="./.benchmark/", help="save directory for benchmark results")
+
+    parser.add_argument("--model-type", type=str, default=".tflite", help="model file type (empty placeholder files)")
+    parser.add_argument("--input-shape", type=int, nargs=2, default=[160, 160], help="input shape of the model")
+    parser.add_argument("--prefix", type=str, default="net", help="model name prefix")
+
+    parser.add_argument("--distribution", type=str, default="lognormal", choices=list(LATENCY_DISTRIBUTIONS), help="latency distribution of an operator")
+    parser.add_argument("--spread", type=float, default=0.05, help="relative spread of the operator latencies")
+    parser.add_argument("--ms-per-mmac", type=float, default=2.0, help="mean latency (ms) per million MACs")
+    parser.add_argument("--op-overhead-ms", type=float, default=0.02, help="mean latency (ms) added to every operator")
+    parser.add_argument("--extra-node-rate", type=float, default=0.2, help="rate of nodes that belong to no layer")
+
+    parser.add_argument("--compress", action="store_true", help="save benchmark results as .json.gz")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    generator = SyntheticBenchmark(
+        input_shape=tuple(args.input_shape),
+        distribution=args.distribution,
+        spread=args.spread,
+        ms_per_mmac=args.ms_per_mmac,
+        op_overhead_ms=args.op_overhead_ms,
+        extra_node_rate=args.extra_node_rate,
+        seed=args.seed,
+    )
+    write_synthetic_dataset(
+        generator, args.n_models, args.model_dir, args.result_dir,
+        model_type=args.model_type, prefix=args.prefix, compress=args.compress)
+
+    print(f"{args.n_models} model configs are saved in {args.model_dir}")
+    print(f"{args.n_models} benchmark results are saved in {args.result_dir}")
+
+
+if __name__ == "__main__":
+    main()
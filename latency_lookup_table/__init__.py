@@ -1 +1,7 @@
-from .helper import get_lookup_table_class, get_stats
\ No newline at end of file
+from .helper import get_lookup_table_class, get_stats, LatencyStats, accumulate_stats, merge_stats, get_final_table
+from .alignment import LayerSpan, align_layers, get_latency_table
+from .benchmark_report import iter_json_array, iter_node_latencies
+from .binary_table import BinaryLatencyTable, load_binary_table, save_binary_table
+from .cost_model import LatencyCostModel, parse_table_key, get_layer_macs
+from .synthetic import SyntheticBenchmark, sample_mbv2_config, write_synthetic_dataset
+from .profiling import BuildProfiler, get_peak_rss_kb
\ No newline at end of file
@@ -0,0 +1,55 @@
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+
+class LayerSpan(NamedTuple):
+    layer: str
+    start: int      # index of the first benchmark node of the layer
+    end: int        # index after the last benchmark node of the layer (exclusive)
+    latency: float  # sum of node latencies in [start, end), not rounded
+
+
+# benchmark nodes (description, duration_ms) -> layer spans
+def align_layers(
+    layer_infos: List[str],
+    layer_to_ops: Dict[str, List[str]],
+    nodes: Iterable[Tuple[str, float]],
+) -> List[LayerSpan]:
+    """
+    Walk the benchmark nodes once and assign them to the layers of `layer_infos`.
+
+    A layer ends on the node that matches its last expected MCU operator.
+    Nodes that do not match the next expected operator (e.g. activations) are
+    accounted to the layer being matched.
+    """
+    signatures = {layer: tuple(ops) for layer, ops in layer_to_ops.items()}
+
+    node_iter = iter(nodes)
+    node_idx = 0
+    spans = []
+
+    for layer in layer_infos:
+        signature = signatures[layer]
+        start = node_idx
+        cursor = 0
+        layer_latency = 0.0
+
+        while cursor < len(signature):
+            try:
+                op_name, op_latency = next(node_iter)
+            except StopIteration:
+                raise ValueError(
+                    f"benchmark nodes are exhausted at node {node_idx} while matching "
+                    f"{signature[cursor]} of layer {layer}") from None
+            node_idx += 1
+
+            layer_latency += op_latency
+            if op_name == signature[cursor]:
+                cursor += 1
+
+        spans.append(LayerSpan(layer, start, node_idx, layer_latency))
+
+    return spans
+
+
+def get_latency_table(spans: List[LayerSpan], ndigits: int = 4) -> Dict[str, float]:
+    return {span.layer: round(span.latency, ndigits) for span in spans}
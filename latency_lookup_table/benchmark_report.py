@@ -0,0 +1,189 @@
+import gzip
+import json
+import re
+
+from typing import Any, Iterator, TextIO, Tuple, Union
+
+# benchmark['benchmark']['info']['graphs'][0]['nodes']
+NODES_PATH = ("benchmark", "info", "graphs", 0, "nodes")
+
+_NON_SPACE = re.compile(r"\S")
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_SCALAR_END = re.compile(r"[,\]}\s]")
+
+_decoder = json.JSONDecoder()
+
+
+class _JsonStreamScanner(object):
+    """
+    Incremental scanner over a JSON text file.
+
+    Only the unconsumed tail of the file is kept in memory, so values that are
+    skipped (e.g. the 'report'/'graph' blobs of a cloud report) never have to
+    be loaded as a whole.
+    """
+    def __init__(self, f: TextIO, chunk_size: int = 1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _fill_or_fail(self):
+        if not self._fill():
+            raise ValueError("unexpected end of JSON input")
+
+    def _peek(self) -> str:
+        while True:
+            m = _NON_SPACE.search(self.buf, self.pos)
+            if m is not None:
+                self.pos = m.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            self._fill_or_fail()
+
+    def _expect(self, char: str):
+        c = self._peek()
+        if c != char:
+            raise ValueError(f"expected '{char}' but found '{c}' in JSON input")
+        self.pos += 1
+
+    def _skip_string(self):
+        # self.pos is right after the opening quote
+        while True:
+            m = _STRING_SPECIAL.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                self._fill_or_fail()
+            elif m.group() == '"':
+                self.pos = m.end()
+                return
+            elif m.end() >= len(self.buf):    # escaped character is not read yet
+                self.pos = m.start()
+                self._fill_or_fail()
+            else:
+                self.pos = m.end() + 1
+
+    def _skip_value(self):
+        c = self._peek()
+        if c == '"':
+            self.pos += 1
+            self._skip_string()
+        elif c in "{[":
+            depth = 0
+            while True:
+                m = _STRUCTURAL.search(self.buf, self.pos)
+                if m is None:
+                    self.pos = len(self.buf)
+                    self._fill_or_fail()
+                    continue
+                self.pos = m.end()
+                if m.group() == '"':
+                    self._skip_string()
+                elif m.group() in "{[":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:   # number, true, false, null
+            while True:
+                m = _SCALAR_END.search(self.buf, self.pos)
+                if m is not None:
+                    self.pos = m.start()
+                    return
+                if not self._fill():
+                    self.pos = len(self.buf)
+                    return
+
+    def _read_string(self) -> str:
+        self._expect('"')
+        while True:
+            try:
+                value, end = json.decoder.scanstring(self.buf, self.pos)
+            except json.JSONDecodeError:
+                self._fill_or_fail()
+                continue
+            self.pos = end
+            return value
+
+    def _read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                self._fill_or_fail()
+                continue
+            # a number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _seek(self, path: Tuple[Union[str, int], ...]):
+        for key in path:
+            if isinstance(key, int):
+                self._expect("[")
+                for _ in range(key):
+                    if self._peek() == "]":
+                        raise IndexError(f"list index out of range: {key}")
+                    self._skip_value()
+                    if self._peek() == ",":
+                        self.pos += 1
+                if self._peek() == "]":
+                    raise IndexError(f"list index out of range: {key}")
+            else:
+                self._expect("{")
+                while True:
+                    if self._peek() == "}":
+                        raise KeyError(key)
+                    name = self._read_string()
+                    self._expect(":")
+                    if name == key:
+                        break
+                    self._skip_value()
+                    if self._peek() == ",":
+                        self.pos += 1
+
+    def iter_array(self, path: Tuple[Union[str, int], ...]) -> Iterator[Any]:
+        self._seek(path)
+        self._expect("[")
+        if self._peek() == "]":
+            return
+        while True:
+            yield self._read_value()
+            c = self._peek()
+            self.pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                raise ValueError(f"expected ',' or ']' but found '{c}' in JSON input")
+
+
+def iter_json_array(f: TextIO, path: Tuple[Union[str, int], ...], chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yield the elements of the JSON array found at `path` one by one,
+    e.g. path=("a", 0, "b") for obj["a"][0]["b"].
+    """
+    return _JsonStreamScanner(f, chunk_size).iter_array(path)
+
+
+def iter_node_latencies(benchmark_file_path: str, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, float]]:
+    """
+    Yield (description, duration_ms) of every node of the first graph in a
+    benchmark result downloaded from the STM32 cloud (optionally gzip compressed, '.gz').
+    """
+    open_fn = gzip.open if benchmark_file_path.endswith(".gz") else open
+    with open_fn(benchmark_file_path, "rt") as f:
+        for node in iter_json_array(f, NODES_PATH, chunk_size):
+            yield node["description"], node["exec_time"]["duration_ms"]
+
@@ -0,0 +1,101 @@
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+from typing import Dict, List
+
+# Layout (little-endian):
+#   header   : magic(8s) version(u32) n_keys(u32) n_fields(u32) names_nbytes(u64)
+#   names    : utf-8 field names followed by table keys, joined by '\n'
+#   padding  : up to 8-byte alignment
+#   columns  : one float64[n_keys] array per field, in field order
+MAGIC = b"STMLUT\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIQ")
+
+FIELDS = ("count", "mean", "std", "min", "max")
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def save_binary_table(lookup_table: Dict[str, Dict[str, float]], path: str):
+    keys = list(lookup_table.keys())
+    fields = [field for field in FIELDS if all(field in lookup_table[key] for key in keys)]
+
+    names = "\n".join(fields + keys).encode("utf-8")
+    data_offset = _align(HEADER.size + len(names))
+
+    # written next to the target and renamed, so processes that mapped the old file keep a valid view
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), len(fields), len(names)))
+        f.write(names)
+        f.write(b"\x00" * (data_offset - HEADER.size - len(names)))
+        for field in fields:
+            column = array("d", (float(lookup_table[key][field]) for key in keys))
+            if sys.byteorder != "little":
+                column.byteswap()
+            column.tofile(f)
+    os.replace(tmp_path, path)
+
+
+class BinaryLatencyTable(object):
+    """
+    Read-only latency lookup table memory-mapped from a file written by save_binary_table().
+
+    The columns are views on the shared page cache, so many worker processes
+    can open the same table without copying it. On big-endian hosts the
+    columns are byteswapped copies, as_numpy() stays a view on any host.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_keys, n_fields, names_nbytes = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a binary latency lookup table (version {VERSION})")
+
+        names = self._mmap[HEADER.size:HEADER.size + names_nbytes].decode("utf-8").split("\n") if names_nbytes else []
+        self.fields: List[str] = names[:n_fields]
+        self.keys: List[str] = names[n_fields:]
+        self.key_to_id = {key: idx for idx, key in enumerate(self.keys)}
+
+        data_offset = _align(HEADER.size + names_nbytes)
+        self._offsets = {field: data_offset + i * n_keys * 8 for i, field in enumerate(self.fields)}
+        view = memoryview(self._mmap)
+        self._columns = {}
+        for field, offset in self._offsets.items():
+            column = view[offset:offset + n_keys * 8].cast("d")
+            if sys.byteorder != "little":   # the file is little-endian
+                column = array("d", column)
+                column.byteswap()
+                column = memoryview(column)
+            self._columns[field] = column
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.key_to_id
+
+    def __getitem__(self, key: str) -> Dict[str, float]:
+        idx = self.key_to_id[key]
+        return {field: column[idx] for field, column in self._columns.items()}
+
+    def column(self, field: str) -> memoryview:
+        return self._columns[field]
+
+    def as_numpy(self, field: str):
+        import numpy as np
+        return np.frombuffer(self._mmap, dtype="<f8", count=len(self.keys), offset=self._offsets[field])
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {key: self[key] for key in self.keys}
+
+
+def load_binary_table(path: str) -> BinaryLatencyTable:
+    return BinaryLatencyTable(path)
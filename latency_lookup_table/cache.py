@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+from typing import Dict, Optional, Tuple
+
+# bump when the per-model analysis changes, so that stale results are not reused
+CACHE_VERSION = 1
+
+
+def _atomic_write_json(path: str, obj):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+class ModelResultCache(object):
+    """
+    Per-model latency tables keyed by the content hash of the
+    (model config, benchmark result) pair.
+
+    Files are only re-hashed when their size or mtime changed since the last run.
+    """
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str, model_class: str, input_shape: Tuple[int, int]):
+        self.cache_dir = cache_dir
+        self.salt = f"{CACHE_VERSION}:{model_class}:{input_shape[0]}x{input_shape[1]}"
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # path -> [size, mtime_ns, sha256]
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        try:
+            with open(self.index_path, "r") as f:
+                self.file_index = json.load(f)
+        except (OSError, ValueError):
+            self.file_index = {}
+
+    def _file_digest(self, path: str) -> str:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+
+        entry = self.file_index.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+
+        self.file_index[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def get_key(self, config_path: str, result_path: str) -> str:
+        h = hashlib.sha256(self.salt.encode())
+        h.update(self._file_digest(config_path).encode())
+        h.update(self._file_digest(result_path).encode())
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._entry_path(key))
+
+    def load(self, key: str) -> Optional[Dict[str, float]]:
+        try:
+            with open(self._entry_path(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key: str, model_latency_table: Dict[str, float]):
+        _atomic_write_json(self._entry_path(key), model_latency_table)
+
+    def flush(self):
+        _atomic_write_json(self.index_path, self.file_index)
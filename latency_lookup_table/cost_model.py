@@ -0,0 +1,168 @@
+import json
+import os
+
+from typing import Dict, List, Sequence, Tuple
+
+# generic group, fitted on every entry, used for layer types without their own model
+ANY_LAYER = "*"
+
+
+def parse_table_key(key: str) -> Tuple:
+    """
+    Inverse of MBV2LatencyTable.query(): table key -> (l_type, input_shape, output_shape, expand, ks, stride, id_skip)
+    e.g. "expanded_conv-input:80x80x16-output:40x40x24-expand:48-kernel:3-stride:2-idskip:0"
+    """
+    l_type, *infos = key.split("-")
+    values = dict(info.split(":", 1) for info in infos)
+
+    def _shape(value: str) -> Tuple[int, ...]:
+        return tuple(int(_) for _ in value.split("x"))
+
+    def _int(name: str):
+        return int(values[name]) if name in values else None
+
+    return (
+        l_type,
+        _shape(values["input"]),
+        _shape(values["output"]),
+        _int("expand"),
+        _int("kernel"),
+        _int("stride"),
+        _int("idskip"),
+    )
+
+
+def _prod(shape: Sequence[int]) -> int:
+    out = 1
+    for _ in shape:
+        out *= _
+    return out
+
+
+def get_layer_macs(spec: Tuple) -> int:
+    l_type, input_shape, output_shape, expand, ks, stride, id_skip = spec
+    in_elems = _prod(input_shape)
+    out_hw = _prod(output_shape[:-1])
+
+    if l_type == "expanded_conv":
+        # pointwise expansion + depthwise + pointwise projection
+        return in_elems * expand + out_hw * expand * ks * ks + out_hw * expand * output_shape[-1]
+    elif l_type == "Conv":
+        # first conv of OFA MobileNetV2 is 3x3
+        return out_hw * output_shape[-1] * input_shape[-1] * 9
+    elif l_type == "AvgPool2D":
+        return in_elems
+    else:   # Conv_1, Logits: pointwise / fully connected
+        return out_hw * output_shape[-1] * input_shape[-1]
+
+
+def get_layer_features(spec: Tuple, group: str) -> List[float]:
+    l_type, input_shape, output_shape, expand, ks, stride, id_skip = spec
+    in_elems = _prod(input_shape)
+    out_elems = _prod(output_shape)
+
+    if group == "expanded_conv":
+        in_hw = _prod(input_shape[:-1])
+        out_hw = _prod(output_shape[:-1])
+        return [
+            1.0,
+            in_elems * expand,                      # expansion MACs
+            out_hw * expand * ks * ks,              # depthwise MACs
+            out_hw * expand * output_shape[-1],     # projection MACs
+            in_elems,
+            in_hw * expand,                         # expanded feature map
+            out_elems,
+            out_elems * id_skip,                    # residual add
+        ]
+    return [1.0, get_layer_macs(spec), in_elems, out_elems]
+
+
+def _solve(a: List[List[float]], b: List[float]) -> List[float]:
+    # Gaussian elimination with partial pivoting
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        if m[col][col] == 0.0:
+            continue
+        for r in range(col + 1, n):
+            factor = m[r][col] / m[col][col]
+            if factor != 0.0:
+                for c in range(col, n + 1):
+                    m[r][c] -= factor * m[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        if m[r][r] != 0.0:
+            x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+
+def _fit_linear(features: List[List[float]], targets: List[float], ridge: float) -> List[float]:
+    n_features = len(features[0])
+
+    # scale every column to [0, 1] so that MACs and element counts are comparable
+    scales = [max(abs(row[i]) for row in features) or 1.0 for i in range(n_features)]
+
+    xtx = [[0.0] * n_features for _ in range(n_features)]
+    xty = [0.0] * n_features
+    for row, target in zip(features, targets):
+        x = [value / scale for value, scale in zip(row, scales)]
+        for i in range(n_features):
+            xty[i] += x[i] * target
+            for j in range(i, n_features):
+                xtx[i][j] += x[i] * x[j]
+    for i in range(n_features):
+        for j in range(i):
+            xtx[i][j] = xtx[j][i]
+        xtx[i][i] += ridge
+
+    coefs = _solve(xtx, xty)
+    return [coef / scale for coef, scale in zip(coefs, scales)]
+
+
+class LatencyCostModel(object):
+    """
+    Linear latency model per layer type, fitted on the entries of a latency lookup table.
+
+    It estimates the latency of layers that were never benchmarked from the
+    layer spec (shapes, expand, kernel, stride, idskip) and its MACs.
+    """
+    def __init__(self, coefs: Dict[str, List[float]] = None):
+        self.coefs = {} if coefs is None else coefs
+
+    @classmethod
+    def fit(cls, lookup_table: Dict[str, Dict[str, float]], stat: str = "mean", ridge: float = 1e-6) -> "LatencyCostModel":
+        samples = {}
+        for key, entry in lookup_table.items():
+            spec = parse_table_key(key)
+            samples.setdefault(spec[0], []).append((spec, entry[stat]))
+            samples.setdefault(ANY_LAYER, []).append((spec, entry[stat]))
+
+        coefs = {}
+        for group, group_samples in samples.items():
+            features = [get_layer_features(spec, group) for spec, _ in group_samples]
+            targets = [latency for _, latency in group_samples]
+            coefs[group] = _fit_linear(features, targets, ridge)
+        return cls(coefs)
+
+    def predict_spec(self, spec: Tuple) -> float:
+        group = spec[0] if spec[0] in self.coefs else ANY_LAYER
+        if group not in self.coefs:
+            raise ValueError("cost model is not fitted")
+        features = get_layer_features(spec, group)
+        return max(0.0, sum(coef * value for coef, value in zip(self.coefs[group], features)))
+
+    def predict(self, key: str) -> float:
+        return self.predict_spec(parse_table_key(key))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.coefs, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LatencyCostModel":
+        with open(path, "r") as f:
+            return cls(json.load(f))
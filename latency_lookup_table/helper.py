@@ -1,5 +1,5 @@
-import statistics
-from typing import List, Dict
+import math
+from typing import Iterable, Dict
 
 from latency_lookup_table.tables import LatencyTable, MBV2LatencyTable
 
@@ -11,20 +11,91 @@ def get_lookup_table_class(table_name: str) -> LatencyTable:
     return TABLE_CLASS_INFO[table_name]
 
 
-def get_stats(lookup_table_list: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
-    stats = {}
+class LatencyStats(object):
+    """
+    Running latency statistics of a layer (Welford's algorithm).
+
+    Samples can be added one at a time with update(), and the statistics of
+    separate shards (e.g. worker processes) can be combined with merge().
+    """
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0       # sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, latency: float) -> "LatencyStats":
+        self.count += 1
+        delta = latency - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (latency - self.mean)
+
+        if latency < self.min:
+            self.min = latency
+        if latency > self.max:
+            self.max = latency
+        return self
+
+    def merge(self, other: "LatencyStats") -> "LatencyStats":
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self) -> float:
+        # sample standard deviation, as statistics.stdev()
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std if self.count > 1 else 0,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+def accumulate_stats(
+    lookup_table_list: Iterable[Dict[str, float]],
+    stats: Dict[str, LatencyStats] = None,
+) -> Dict[str, LatencyStats]:
+    stats = {} if stats is None else stats
     for model_latency_table in lookup_table_list:
         for layer_name, latency in model_latency_table.items():
             if layer_name not in stats:
-                stats[layer_name] = []
-            stats[layer_name].append(latency)
-
-    final_table = {}
-    for layer_name, latencies in stats.items():
-        final_table[layer_name] = {
-            "count": len(latencies),
-            "mean": statistics.mean(latencies),
-            "std": statistics.stdev(latencies) if len(latencies) > 1 else 0,
-        }
+                stats[layer_name] = LatencyStats()
+            stats[layer_name].update(latency)
+    return stats
+
+
+def merge_stats(stats: Dict[str, LatencyStats], other: Dict[str, LatencyStats]) -> Dict[str, LatencyStats]:
+    for layer_name, layer_stats in other.items():
+        if layer_name not in stats:
+            stats[layer_name] = LatencyStats()
+        stats[layer_name].merge(layer_stats)
+    return stats
+
+
+def get_final_table(stats: Dict[str, LatencyStats]) -> Dict[str, Dict[str, float]]:
+    return {layer_name: layer_stats.to_dict() for layer_name, layer_stats in stats.items()}
+
 
-    return final_table
\ No newline at end of file
+def get_stats(lookup_table_list: Iterable[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return get_final_table(accumulate_stats(lookup_table_list))
@@ -0,0 +1,112 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+from latency_lookup_table.tables import MBV2LatencyTable
+from latency_lookup_table.binary_table import BinaryLatencyTable
+from latency_lookup_table.cost_model import LatencyCostModel
+
+
+class MBV2LatencyPredictor(object):
+    """
+    Batch latency predictor over a MobileNetV2 latency lookup table.
+
+    Table keys are mapped to integer ids and their latencies are stored in a
+    dense array. Layer specs are resolved to ids through a dict, so the key
+    string of a layer is only formatted the first time the layer is seen and
+    scoring a batch is a gather-and-sum over the array.
+
+    With a `fallback` cost model, layers that are not in the table are
+    estimated once instead of raising a KeyError.
+    """
+    def __init__(
+        self,
+        keys: List[str],
+        latencies: np.ndarray,
+        input_shape: Tuple[int, int],
+        key_to_id: Dict[str, int] = None,
+        fallback: LatencyCostModel = None,
+    ):
+        self.table_builder = MBV2LatencyTable(input_shape=input_shape)
+
+        self.keys = keys
+        self.key_to_id = {key: idx for idx, key in enumerate(keys)} if key_to_id is None else key_to_id
+        self.latencies = latencies
+
+        # layers missing from the table are estimated by `fallback` and get ids after the table ids
+        self.fallback = fallback
+        self.estimated_key_to_id = {}
+        self._estimated_latencies = []
+        self._all_latencies = latencies
+
+        self._spec_to_id = {}
+
+    @classmethod
+    def from_dict(cls, lookup_table: Dict[str, Dict[str, float]], input_shape: Tuple[int, int], stat: str = "mean", fallback: LatencyCostModel = None) -> "MBV2LatencyPredictor":
+        keys = list(lookup_table.keys())
+        latencies = np.array([lookup_table[key][stat] for key in keys], dtype=np.float64)
+        return cls(keys, latencies, input_shape, fallback=fallback)
+
+    @classmethod
+    def from_yaml(cls, table_path: str, input_shape: Tuple[int, int], stat: str = "mean", fallback: LatencyCostModel = None) -> "MBV2LatencyPredictor":
+        with open(table_path, "r") as f:
+            lookup_table = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        return cls.from_dict(lookup_table, input_shape, stat, fallback)
+
+    @classmethod
+    def from_binary(cls, table_path: str, input_shape: Tuple[int, int], stat: str = "mean", fallback: LatencyCostModel = None) -> "MBV2LatencyPredictor":
+        # latencies stay a read-only view on the memory-mapped file
+        table = BinaryLatencyTable(table_path)
+        return cls(table.keys, table.as_numpy(stat), input_shape, key_to_id=table.key_to_id, fallback=fallback)
+
+    def _get_id(self, spec: Tuple) -> int:
+        layer_id = self._spec_to_id.get(spec)
+        if layer_id is None:
+            key = self.table_builder.query(*spec)
+            if key in self.key_to_id:
+                layer_id = self.key_to_id[key]
+            elif self.fallback is not None:
+                layer_id = self._add_estimate(key, self.fallback.predict_spec(spec))
+            else:
+                raise KeyError(f"layer is not in the latency lookup table: {key}")
+            self._spec_to_id[spec] = layer_id
+        return layer_id
+
+    def _add_estimate(self, key: str, latency: float) -> int:
+        layer_id = len(self.keys) + len(self._estimated_latencies)
+        self.estimated_key_to_id[key] = layer_id
+        self._estimated_latencies.append(latency)
+        self._all_latencies = None
+        return layer_id
+
+    def _get_latencies(self) -> np.ndarray:
+        if self._all_latencies is None:
+            self._all_latencies = np.concatenate(
+                [self.latencies, np.asarray(self._estimated_latencies, dtype=np.float64)])
+        return self._all_latencies
+
+    def get_layer_ids(self, cfg) -> List[int]:   # config = subnet.config
+        return [self._get_id(spec) for spec in self.table_builder.get_layer_specs(cfg)]
+
+    def predict(self, configs: Sequence[dict]) -> np.ndarray:
+        """
+        Predicted latency (ms) of every subnet config, shape (len(configs),).
+        """
+        layer_ids = []
+        n_layers = []
+        for cfg in configs:
+            ids = self.get_layer_ids(cfg)
+            layer_ids.extend(ids)
+            n_layers.append(len(ids))
+
+        owners = np.repeat(np.arange(len(n_layers)), n_layers)
+        return np.bincount(
+            owners,
+            weights=self._get_latencies()[np.asarray(layer_ids, dtype=np.intp)],
+            minlength=len(n_layers),
+        )
+
+    def predict_one(self, cfg) -> float:
+        layer_ids = self.get_layer_ids(cfg)
+        return float(self._get_latencies()[layer_ids].sum())
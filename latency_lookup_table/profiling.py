@@ -0,0 +1,160 @@
+import contextlib
+import json
+import os
+import sys
+import time
+
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None
+
+
+def get_peak_rss_kb(children: bool = False) -> Optional[int]:
+    """ Peak resident set size (KiB) of this process, or of its terminated child processes """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak   # bytes on macOS, KiB on Linux
+
+
+class _Stage(object):
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "BuildProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class BuildProfiler(object):
+    """
+    Wall time and call count of each stage of the latency table build, with
+    counters (e.g. bytes read) and the progress of the models.
+
+    Worker processes keep their own profiler and send pop() with every
+    result, the main process adds it with merge(), and calls workers_started()
+    so that their peak RSS is reported. With `enabled=False` every method is
+    a no-op.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: Dict[str, list] = {}       # stage -> [seconds, calls]
+        self.counters: Dict[str, int] = {}
+        self.has_workers = False
+
+        self.n_models = 0
+        self.n_done = 0
+        self.init_time = time.perf_counter()     # the whole build
+        self.start_time = self.init_time        # the models, for the progress
+        self.end_time = None
+
+    def stage(self, name: str):
+        return _Stage(self, name) if self.enabled else contextlib.nullcontext()
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [seconds, calls]
+        else:
+            stage[0] += seconds
+            stage[1] += calls
+
+    def count(self, name: str, value: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def pop(self) -> dict:
+        """ Stages and counters recorded since the last pop() """
+        if not self.enabled:
+            return {}
+        out = {"stages": self.stages, "counters": self.counters}
+        self.stages, self.counters = {}, {}
+        return out
+
+    def workers_started(self):
+        self.has_workers = True
+
+    def merge(self, other: dict):
+        for name, (seconds, calls) in other.get("stages", {}).items():
+            self.add(name, seconds, calls)
+        for name, value in other.get("counters", {}).items():
+            self.count(name, value)
+
+    # progress
+
+    def start(self, n_models: int):
+        self.n_models = n_models
+        self.n_done = 0
+        self.start_time = time.perf_counter()
+
+    def model_done(self):
+        self.n_done += 1
+
+    def _now(self) -> float:
+        return time.perf_counter() if self.end_time is None else self.end_time
+
+    def format_progress(self, name: str) -> str:
+        # counts the model being reported, which is accumulated right after
+        done = self.n_done + 1
+        elapsed = self._now() - self.start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.n_models - done) / rate if rate > 0 else float("inf")
+        return f"[{done}/{self.n_models}] {name} is processed ({rate:.1f} models/s, ETA {eta:.1f}s)"
+
+    def stop(self):
+        self.end_time = time.perf_counter()
+
+    # report
+
+    def to_dict(self) -> dict:
+        wall_seconds = self._now() - self.init_time
+        stats = {
+            "n_models": self.n_models,
+            "n_done": self.n_done,
+            "wall_seconds": round(wall_seconds, 6),
+            "models_per_sec": round(self.n_done / wall_seconds if wall_seconds > 0 else 0.0, 3),
+            "peak_rss_kb": get_peak_rss_kb(),
+            "counters": dict(self.counters),
+            "stages": {name: {"seconds": round(seconds, 6), "calls": calls}
+                       for name, (seconds, calls) in self.stages.items()},
+        }
+        # RUSAGE_CHILDREN only means the workers when a process pool ran
+        if self.has_workers:
+            stats["peak_rss_children_kb"] = get_peak_rss_kb(children=True)
+        return stats
+
+    def save(self, path: str, **extra):
+        stats = self.to_dict()
+        stats.update(extra)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        stats = self.to_dict()
+        rss = stats["peak_rss_kb"]
+        children_rss = stats.get("peak_rss_children_kb")
+        print(f"Build profile: {stats['n_done']} models in {stats['wall_seconds']:.3f}s "
+              f"({stats['models_per_sec']:.1f} models/s)")
+        if rss is not None:
+            print(f"    peak RSS: {rss / 1024:.1f} MiB" + (f", workers: {children_rss / 1024:.1f} MiB" if children_rss else ""))
+        for name, value in stats["counters"].items():
+            print(f"    {name}: {value}")
+
+        # stages of the workers add up across processes, their share is relative to the sum of the stages
+        total = sum(stage["seconds"] for stage in stats["stages"].values())
+        print(f"    {'stage':<20}{'calls':>10}{'seconds':>12}{'share':>8}")
+        for name, stage in stats["stages"].items():
+            share = 100 * stage["seconds"] / total if total else 0.0
+            print(f"    {name:<20}{stage['calls']:>10}{stage['seconds']:>12.3f}{share:>7.1f}%")
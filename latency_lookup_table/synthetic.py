@@ -0,0 +1,229 @@
+import gzip
+import json
+import os
+import random
+
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from latency_lookup_table.cost_model import get_layer_macs
+from latency_lookup_table.ops.mobilenetv2 import STM_OP_DICT
+from latency_lookup_table.tables import MBV2LatencyTable
+
+# OFA MobileNetV2 (ProxylessNAS space, width 1.0): first conv, first block, 6 stages, feature mix
+FIRST_CONV_CHANNELS = 32
+FIRST_BLOCK_CHANNELS = 16
+STAGE_WIDTHS = (24, 40, 80, 96, 192, 320)
+STAGE_STRIDES = (2, 2, 2, 1, 2, 1)
+FEATURE_MIX_CHANNELS = 1280
+N_CLASSES = 1000
+
+KS_LIST = (3, 5, 7)
+EXPAND_LIST = (3, 4, 6)
+DEPTH_LIST = (2, 3, 4)
+
+# operators that do not belong to any layer, e.g. the quantization / format nodes of a report
+EXTRA_OPS = ("NL",)
+
+
+def _make_divisible(value: float, divisor: int = 8) -> int:
+    new_value = max(divisor, int(value + divisor / 2) // divisor * divisor)
+    if new_value < 0.9 * value:
+        new_value += divisor
+    return new_value
+
+
+def _mb_conv(in_channels: int, out_channels: int, ks: int, stride: int, expand: int, mid_channels) -> dict:
+    shortcut = None
+    if stride == 1 and in_channels == out_channels:     # OFA adds an identity shortcut when the block keeps its shape
+        shortcut = {"name": "IdentityLayer", "in_channels": [in_channels], "out_channels": [out_channels]}
+    return {
+        "mobile_inverted_conv": {
+            "name": "MBInvertedConvLayer",
+            "in_channels": in_channels,
+            "out_channels": out_channels,
+            "kernel_size": ks,
+            "stride": stride,
+            "expand_ratio": expand,
+            "mid_channels": mid_channels,
+            "act_func": "relu6",
+            "use_se": False,
+        },
+        "shortcut": shortcut,
+    }
+
+
+def sample_mbv2_config(
+    rng: random.Random,
+    name: str = None,
+    ks_list: Sequence[int] = KS_LIST,
+    expand_list: Sequence[int] = EXPAND_LIST,
+    depth_list: Sequence[int] = DEPTH_LIST,
+) -> dict:
+    """
+    Random OFA MobileNetV2 subnet config, as saved from `subnet.config`.
+    The last stage has a single block, as in OFA.
+    """
+    blocks = [_mb_conv(FIRST_CONV_CHANNELS, FIRST_BLOCK_CHANNELS, 3, 1, 1, None)]
+    in_channels = FIRST_BLOCK_CHANNELS
+    for stage_idx, (width, stride) in enumerate(zip(STAGE_WIDTHS, STAGE_STRIDES)):
+        depth = 1 if stage_idx == len(STAGE_WIDTHS) - 1 else rng.choice(depth_list)
+        for block_idx in range(depth):
+            expand = rng.choice(expand_list)
+            blocks.append(_mb_conv(
+                in_channels, width, rng.choice(ks_list), stride if block_idx == 0 else 1,
+                expand, _make_divisible(in_channels * expand)))
+            in_channels = width
+
+    return {
+        "name": "MobileNetV2" if name is None else name,
+        "bn": {"momentum": 0.1, "eps": 1e-05},
+        "first_conv": {"name": "ConvLayer", "in_channels": 3, "out_channels": FIRST_CONV_CHANNELS,
+                       "kernel_size": 3, "stride": 2, "act_func": "relu6"},
+        "blocks": blocks,
+        "feature_mix_layer": {"name": "ConvLayer", "in_channels": in_channels, "out_channels": FEATURE_MIX_CHANNELS,
+                              "kernel_size": 1, "stride": 1, "act_func": "relu6"},
+        "classifier": {"name": "LinearLayer", "in_features": FEATURE_MIX_CHANNELS, "out_features": N_CLASSES},
+    }
+
+
+# distribution name -> f(rng, mean, spread): one latency sample around `mean`
+LATENCY_DISTRIBUTIONS: Dict[str, Callable[[random.Random, float, float], float]] = {
+    "constant": lambda rng, mean, spread: mean,
+    "uniform": lambda rng, mean, spread: mean * rng.uniform(1 - spread, 1 + spread),
+    "normal": lambda rng, mean, spread: max(0.0, rng.gauss(mean, mean * spread)),
+    "lognormal": lambda rng, mean, spread: mean * rng.lognormvariate(-spread * spread / 2, spread),
+}
+
+
+class SyntheticBenchmark(object):
+    """
+    Random model configs and STM32 Cloud benchmark reports that match them.
+
+    The nodes of a report follow STM_OP_DICT layer by layer. The mean latency
+    of a layer grows with its MACs (`ms_per_mmac`) plus `op_overhead_ms` per
+    operator, and each benchmark draws the operator latencies from
+    `distribution` (see LATENCY_DISTRIBUTIONS) with a relative `spread`.
+    Nodes that belong to no layer are inserted at a rate of `extra_node_rate`.
+
+    The same seed gives the same configs and reports.
+    """
+    def __init__(
+        self,
+        input_shape: Tuple[int, int],
+        distribution: str = "lognormal",
+        spread: float = 0.05,
+        ms_per_mmac: float = 2.0,
+        op_overhead_ms: float = 0.02,
+        extra_node_rate: float = 0.2,
+        seed: int = 0,
+        ks_list: Sequence[int] = KS_LIST,
+        expand_list: Sequence[int] = EXPAND_LIST,
+        depth_list: Sequence[int] = DEPTH_LIST,
+    ):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"unknown latency distribution '{distribution}', use one of {list(LATENCY_DISTRIBUTIONS)}")
+
+        # only the layer specs are used, table keys (and their cache) are left to the code under test
+        self.table_builder = MBV2LatencyTable(input_shape=input_shape)
+        self.sample_latency = LATENCY_DISTRIBUTIONS[distribution]
+        self.spread = spread
+        self.ms_per_mmac = ms_per_mmac
+        self.op_overhead_ms = op_overhead_ms
+        self.extra_node_rate = extra_node_rate
+        self.ks_list = ks_list
+        self.expand_list = expand_list
+        self.depth_list = depth_list
+
+        self.rng = random.Random(seed)
+
+    def sample_config(self, name: str = None) -> dict:
+        return sample_mbv2_config(self.rng, name, self.ks_list, self.expand_list, self.depth_list)
+
+    def get_layer_ops(self, cfg) -> List[Tuple[Tuple, List[str]]]:
+        """ (layer spec, operators) of every layer, the first expanded_conv is block0 as in get_opcode() """
+        layer_ops = []
+        for idx, spec in enumerate(self.table_builder.get_layer_specs(cfg)):
+            l_type, _, _, _, _, stride, id_skip = spec
+            if l_type == "expanded_conv":
+                op_type = "block0" if idx == 1 else f"expanded_conv-stride:{stride}-idskip:{id_skip}"
+            else:
+                op_type = l_type
+            layer_ops.append((spec, STM_OP_DICT[op_type]))
+        return layer_ops
+
+    def get_mean_latency(self, spec: Tuple, n_ops: int) -> float:
+        return get_layer_macs(spec) / 1e6 * self.ms_per_mmac + n_ops * self.op_overhead_ms
+
+    def get_nodes(self, cfg) -> List[dict]:
+        nodes = []
+        for spec, ops in self.get_layer_ops(cfg):
+            op_mean = self.get_mean_latency(spec, len(ops)) / len(ops)
+            for op in ops:
+                nodes.append(self._node(len(nodes), op, self.sample_latency(self.rng, op_mean, self.spread)))
+                if self.rng.random() < self.extra_node_rate:
+                    extra_op = self.rng.choice(EXTRA_OPS)
+                    nodes.append(self._node(len(nodes), extra_op, self.rng.uniform(0.0, self.op_overhead_ms)))
+        return nodes
+
+    @staticmethod
+    def _node(c_id: int, op: str, duration_ms: float) -> dict:
+        duration_ms = round(duration_ms, 6)
+        return {
+            "c_id": c_id,
+            "name": f"{op.lower()}_{c_id}",
+            "description": op,
+            "exec_time": {"duration_ms": duration_ms, "cycles": int(duration_ms * 480000)},
+        }
+
+    def get_report(self, cfg, benchmark_id: str = None, board_name: str = "STM32H747I-DISCO") -> dict:
+        """ Benchmark reply of the STM32 Cloud, as saved by the benchmark notebook """
+        nodes = self.get_nodes(cfg)
+        duration_ms = round(sum(node["exec_time"]["duration_ms"] for node in nodes), 6)
+        return {
+            "benchmarkId": cfg.get("name") if benchmark_id is None else benchmark_id,
+            "board": board_name,
+            "state": "done",
+            "report": {"rom_size": 0, "ram_size": [0], "rom_n_macc": 0},
+            "graph": {"exec_time": {"duration_ms": duration_ms, "cycles": int(duration_ms * 480000),
+                                    "device": board_name}},
+            "benchmark": {"info": {"graphs": [{"nodes": nodes}]}},
+        }
+
+    def iter_models(self, n_models: int, prefix: str = "net") -> Iterator[Tuple[str, dict, dict]]:
+        """ Yield (name, config, report) of `n_models` models, generated one at a time """
+        width = len(str(max(n_models - 1, 0)))
+        for idx in range(n_models):
+            name = f"{prefix}{idx:0{width}d}"
+            cfg = self.sample_config(name)
+            yield name, cfg, self.get_report(cfg, name)
+
+
+def write_synthetic_dataset(
+    generator: SyntheticBenchmark,
+    n_models: int,
+    model_dir: str,
+    result_dir: str,
+    model_type: str = ".tflite",
+    prefix: str = "net",
+    compress: bool = False,
+) -> int:
+    """
+    Save `n_models` (config, report) pairs in the layout read by build_latency_table.py:
+    `model_dir/<name>.json` + an empty `model_dir/<name><model_type>`, and `result_dir/<name>.json(.gz)`
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    os.makedirs(result_dir, exist_ok=True)
+
+    for name, cfg, report in generator.iter_models(n_models, prefix):
+        with open(os.path.join(model_dir, f"{name}.json"), "w") as f:
+            json.dump(cfg, f, indent=2)
+        # build_latency_table.py finds the models by their model file, its content is not read
+        open(os.path.join(model_dir, f"{name}{model_type}"), "wb").close()
+
+        if compress:
+            with gzip.open(os.path.join(result_dir, f"{name}.json.gz"), "wt") as f:
+                json.dump(report, f)
+        else:
+            with open(os.path.join(result_dir, f"{name}.json"), "w") as f:
+                json.dump(report, f)
+    return n_models
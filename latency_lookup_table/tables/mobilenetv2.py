@@ -4,11 +4,38 @@
 # Han Cai, Chuang Gan, Tianzhe Wang, Zhekai Zhang, Song Han
 # International Conference on Learning Representations (ICLR), 2020.
 
+import functools
+import sys
+
 from typing import List, Tuple
 
 from latency_lookup_table.tables.base import LatencyTable
 from latency_lookup_table.ops.mobilenetv2 import get_opcode
 
+# number of distinct layers whose key is kept by _get_table_key()
+KEY_CACHE_SIZE = 1 << 16
+
+# raw query arguments -> table key
+# the same layers repeat across sampled subnets, so keys are built once and shared (interned)
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def _get_table_key(l_type: str, input_shape, output_shape, expand, ks, stride, id_skip) -> str:
+    infos = [
+        l_type,
+        "input:%s" % LatencyTable.repr_shape(input_shape),
+        "output:%s" % LatencyTable.repr_shape(output_shape),
+    ]
+
+    if l_type in ("expanded_conv",):
+        assert None not in (expand, ks, stride, id_skip)
+        infos += [
+            "expand:%d" % expand,
+            "kernel:%d" % ks,
+            "stride:%d" % stride,
+            "idskip:%d" % id_skip,
+        ]
+    return sys.intern("-".join(infos))
+
+
 class MBV2LatencyTable(LatencyTable):
     def __init__(self, input_shape: Tuple[int, int]):
         super(MBV2LatencyTable, self).__init__(input_shape)
@@ -26,32 +53,25 @@ class MBV2LatencyTable(LatencyTable):
         stride=None,
         id_skip=None,
     ):
-        infos = [
-            l_type,
-            "input:%s" % self.repr_shape(input_shape),
-            "output:%s" % self.repr_shape(output_shape),
-        ]
-
-        if l_type in ("expanded_conv",):
-            assert None not in (expand, ks, stride, id_skip)
-            infos += [
-                "expand:%d" % expand,
-                "kernel:%d" % ks,
-                "stride:%d" % stride,
-                "idskip:%d" % id_skip,
-            ]
-        key = "-".join(infos)
-        return key
-
-
-    def get_table_key_list(self, cfg):   # config = subnet.config
-        model_name = cfg["name"]
-        key_list = []
+        if isinstance(input_shape, list):
+            input_shape = tuple(input_shape)
+        if isinstance(output_shape, list):
+            output_shape = tuple(output_shape)
+        return _get_table_key(l_type, input_shape, output_shape, expand, ks, stride, id_skip)
+
+
+    def get_layer_specs(self, cfg) -> List[Tuple]:   # config = subnet.config
+        """
+        Raw query arguments of every layer, (l_type, input_shape, output_shape, expand, ks, stride, id_skip).
+        Shapes are tuples so that the specs can be used as dict keys.
+        """
+        spec_list = []
         
-        key_list.append(self.query(
+        spec_list.append((
             "Conv",
-            [self.input_shape[0], self.input_shape[1], cfg["first_conv"]["in_channels"]],
-            [(self.input_shape[0] + 1) // 2, (self.input_shape[1] + 1) // 2, cfg["first_conv"]["out_channels"]],
+            (self.input_shape[0], self.input_shape[1], cfg["first_conv"]["in_channels"]),
+            ((self.input_shape[0] + 1) // 2, (self.input_shape[1] + 1) // 2, cfg["first_conv"]["out_channels"]),
+            None, None, None, None,
         ))
         # blocks
         fsize_1 = (self.input_shape[0] + 1) // 2
@@ -74,14 +94,14 @@ class MBV2LatencyTable(LatencyTable):
                     _mid_channels = mb_conv["out_channels"]
                 else:
                     _mid_channels = mb_conv["mid_channels"]
-                key_list.append(self.query(
+                spec_list.append((
                     "expanded_conv",
-                    [fsize_1, fsize_2, mb_conv["in_channels"]],    
-                    [out_fz_1, out_fz_2, mb_conv["out_channels"]],   
-                    expand=_mid_channels,
-                    ks=mb_conv["kernel_size"],
-                    stride=mb_conv["stride"],
-                    id_skip=idskip,
+                    (fsize_1, fsize_2, mb_conv["in_channels"]),    
+                    (out_fz_1, out_fz_2, mb_conv["out_channels"]),   
+                    _mid_channels,
+                    mb_conv["kernel_size"],
+                    mb_conv["stride"],
+                    idskip,
                 ))
                 _out_channels = mb_conv["out_channels"]
             else:
@@ -94,21 +114,28 @@ class MBV2LatencyTable(LatencyTable):
         avg_pool_channels = last_block_out_channels
 
         if cfg["feature_mix_layer"] is not None:
-            key_list.append(self.query(
+            spec_list.append((
                 "Conv_1",
-                [fsize_1, fsize_2, cfg["feature_mix_layer"]["in_channels"]],
-                [fsize_1, fsize_2, cfg["feature_mix_layer"]["out_channels"]],
+                (fsize_1, fsize_2, cfg["feature_mix_layer"]["in_channels"]),
+                (fsize_1, fsize_2, cfg["feature_mix_layer"]["out_channels"]),
+                None, None, None, None,
             ))
             avg_pool_channels = cfg["feature_mix_layer"]["out_channels"]
 
-        key_list.append(self.query(
+        spec_list.append((
             "AvgPool2D",
-            [fsize_1, fsize_2, avg_pool_channels], 
-            [1, 1, avg_pool_channels],
+            (fsize_1, fsize_2, avg_pool_channels), 
+            (1, 1, avg_pool_channels),
+            None, None, None, None,
         ))
         
         # classifier
-        key_list.append(self.query(
-            "Logits", [1, 1, cfg["classifier"]["in_features"]], [cfg["classifier"]["out_features"]]
+        spec_list.append((
+            "Logits", (1, 1, cfg["classifier"]["in_features"]), (cfg["classifier"]["out_features"],),
+            None, None, None, None,
         ))
-        return key_list
\ No newline at end of file
+        return spec_list
+
+
+    def get_table_key_list(self, cfg):   # config = subnet.config
+        return [self.query(*spec) for spec in self.get_layer_specs(cfg)]
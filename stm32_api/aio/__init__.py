@@ -0,0 +1,4 @@
+from .http_requests import AsyncHttpClient, AsyncResponse
+from .file_manager import AsyncFileManager
+from .benchmark_service import AsyncBenchmarkService
+from .benchmark_manager import AsyncBenchmarkManager
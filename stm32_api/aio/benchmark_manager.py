@@ -0,0 +1,227 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import os
+import json
+import asyncio
+import logging
+import collections
+
+from typing import AsyncIterator, Dict, Iterable, Tuple, Union
+
+from stm32_api.helper import get_benchmark_service_ep
+from stm32_api.aio.file_manager import AsyncFileManager
+from stm32_api.aio.benchmark_service import AsyncBenchmarkService
+from stm32_api.benchmark.benchmark_manager import check_version
+from stm32_api.benchmark.benchmark_pipeline import BenchmarkJob
+
+from stm32_api.utils import CliParameters, BenchmarkServerError, ServerError, LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class AsyncBenchmarkManager:
+    """
+        Non-blocking counterpart of stm32_api.benchmark.BenchmarkManager.
+
+        benchmark() runs the whole upload -> trigger -> wait -> save -> delete
+        flow of one job and benchmark_many() runs up to `max_in_flight` of
+        them at once, all in the current event loop.
+
+        A model file is uploaded once for all the jobs that use it (e.g. one
+        per board) and deleted from the cloud after the last of them, queued
+        jobs included, as in BenchmarkPipeline.
+    """
+    def __init__(self, file_manager: AsyncFileManager, path: str, stm_version: str = None):
+        self.file_manager = file_manager
+        self.client = file_manager.client
+        self.benchmark_service = AsyncBenchmarkService(file_manager, stm_version)
+        self.version = stm_version
+        self.bid_list = []
+
+        self._version_checked = False
+        self._version_lock = asyncio.Lock()
+        self._uploads: Dict[str, asyncio.Task] = {}     # model file path -> upload, returns the name on the cloud
+        self._users = collections.Counter()             # model file path -> jobs not over yet
+
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+        self.BENCHMARK_SERVICE_URL = get_benchmark_service_ep() + '/benchmark/'
+
+    async def delete_result_given_id(self, benchmark_id):
+        resp = await self.client.send_delete(self.BENCHMARK_SERVICE_URL + benchmark_id, self.file_manager.auth_token)
+        if resp.status_code not in (200, 204):
+            raise BenchmarkServerError(
+                f"Benchmark result {benchmark_id} is not deleted, server response code is {resp.status_code}")
+
+        print(f'\nBenchmark result {benchmark_id} is deleted')
+
+    async def get_result_given_id(self, benchmark_id, result_path=None, compress=False):
+        if result_path is None:
+            result_path = os.path.join(self.path, benchmark_id + ".json")
+
+        result_path = await self.client.download_to_file(
+            self.BENCHMARK_SERVICE_URL + benchmark_id,
+            self.file_manager.auth_token,
+            result_path,
+            compress=compress)
+
+        print(f'Benchmark result is saved: {result_path}')
+        return result_path
+
+    async def get_benchmark_boards(self) -> dict:
+        return await self.benchmark_service.list_boards()
+
+    def _save(self, job: BenchmarkJob, result: dict) -> str:
+        result_dir = os.path.dirname(job.result_path)
+        if result_dir:
+            os.makedirs(result_dir, exist_ok=True)
+
+        tmp_path = f'{job.result_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp_path, job.result_path)
+
+        print(f'Benchmark result is saved: {job.result_path}')
+        return job.result_path
+
+    async def check_version(self):
+        """ Same check as BenchmarkManager: an unsupported version is replaced by the latest one """
+        async with self._version_lock:
+            if not self._version_checked:
+                supported_versions = await self.benchmark_service.get_supported_versions()
+                self.version = check_version(self.version, supported_versions)
+                self._version_checked = True
+
+    def _hold(self, job: BenchmarkJob):
+        self._users[job.file_path] += 1
+
+    async def _upload_model(self, job: BenchmarkJob) -> str:
+        # identical files are uploaded once, the benchmark runs on the name they were uploaded with
+        cloud_name = await self.file_manager.upload_model(file_path=job.file_path, model_name=job.model_name)
+        if cloud_name is None:
+            raise ServerError(f'Upload of the model file {job.file_path} failed')
+        return cloud_name
+
+    async def _upload(self, job: BenchmarkJob) -> str:
+        # concurrent jobs of the same file wait for one upload
+        task = self._uploads.get(job.file_path)
+        if task is None:
+            print(f"Uploading the '{job.model_name}' model file to the STM32 Cloud")
+            task = asyncio.ensure_future(self._upload_model(job))
+            self._uploads[job.file_path] = task
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if self._uploads.get(job.file_path) is task:     # the next job tries again
+                del self._uploads[job.file_path]
+            raise
+
+    async def _release(self, job: BenchmarkJob, cleanup: bool):
+        # the model is deleted from the cloud once no job needs it anymore
+        self._users[job.file_path] -= 1
+        if self._users[job.file_path] > 0:
+            return
+        del self._users[job.file_path]
+        task = self._uploads.pop(job.file_path, None)
+        if not cleanup or task is None or not task.done() or task.cancelled() or task.exception() is not None:
+            return
+        cloud_name = task.result()
+        # the name may also be the upload of another (identical) file that is still in use
+        for other in self._uploads.values():
+            if other.done() and not other.cancelled() and other.exception() is None and other.result() == cloud_name:
+                return
+        try:
+            await self.file_manager.delete_model(cloud_name)
+        except Exception as e:
+            logger.warning(f'Deletion of the model {cloud_name} failed: {e}')
+
+    async def benchmark(self, job: BenchmarkJob, options: dict, timeout=600,
+                        pooling_delay=None, cleanup=True) -> str:
+        """
+            Benchmark one job, `options` are the CliParameters arguments except 'model'.
+            Returns the path of the saved result.
+        """
+        self._hold(job)
+        try:
+            return await self._benchmark(job, options, timeout, pooling_delay, cleanup)
+        finally:
+            await self._release(job, cleanup)
+
+    async def _benchmark(self, job: BenchmarkJob, options: dict, timeout, pooling_delay, cleanup) -> str:
+        await self.check_version()
+        cloud_name = await self._upload(job)
+
+        bid = await self.benchmark_service.trigger_benchmark(
+            CliParameters(model=cloud_name, **options), job.board_name, self.version)
+        print(f'Benchmark of {job.model_name} on {job.board_name} triggered with id {bid}')
+        self.bid_list.append(bid)
+
+        try:
+            result, state_durations = await self.benchmark_service.wait_for_run(
+                bid, timeout=timeout, pooling_delay=pooling_delay)
+            if result is None:
+                raise TimeoutError(f'Benchmark {bid} is not done after {timeout}s')
+            logger.debug(f'Benchmark({bid}) time per state: {state_durations}')
+            # the file is small, it is written from the loop thread
+            return self._save(job, result)
+        finally:
+            if cleanup:
+                try:
+                    await self.delete_result_given_id(bid)
+                except Exception as e:
+                    logger.warning(f'Cleanup of benchmark {bid} failed: {e}')
+
+    async def benchmark_many(
+        self,
+        jobs: Iterable[BenchmarkJob],
+        options: dict,
+        max_in_flight: int = 4,
+        timeout=600,
+        pooling_delay=None,
+        cleanup=True,
+    ) -> AsyncIterator[Tuple[BenchmarkJob, Union[str, Exception]]]:
+        """
+            Yield (job, result path) as each benchmark finishes, or (job, exception)
+            when it fails. Failures do not stop the other jobs.
+        """
+        semaphore = asyncio.Semaphore(max_in_flight)
+        jobs = list(jobs)
+        started = set()
+
+        # queued jobs hold their model file too, so that it is not deleted before they start
+        for job in jobs:
+            self._hold(job)
+
+        async def _run(idx: int, job: BenchmarkJob):
+            started.add(idx)
+            try:
+                async with semaphore:
+                    try:
+                        return job, await self._benchmark(job, options, timeout, pooling_delay, cleanup)
+                    except Exception as e:
+                        print(f'Error: {job.model_name} on {job.board_name}: {e}')
+                        return job, e
+            finally:
+                await self._release(job, cleanup)
+
+        tasks = [asyncio.ensure_future(_run(idx, job)) for idx, job in enumerate(jobs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # jobs cancelled before they started give their hold back here, the others in _run()
+            for idx, job in enumerate(jobs):
+                if idx not in started:
+                    await self._release(job, cleanup)
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, jobs: Iterable[BenchmarkJob], options: dict, **kwargs):
+        return [outcome async for outcome in self.benchmark_many(jobs, options, **kwargs)]
@@ -0,0 +1,166 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import json
+import time
+import typing
+import asyncio
+import logging
+
+from typing import Union
+
+from stm32_api.helper import get_supported_versions, get_benchmark_service_ep
+from stm32_api.aio.file_manager import AsyncFileManager
+from stm32_api.benchmark.benchmark_service import build_arguments_dict
+from stm32_api.benchmark.polling import PollingPolicy, StateTracker, STATE_MESSAGES, is_retryable_error
+
+from stm32_api.utils import CliParameters, LOGGER_NAME
+from stm32_api.utils import BenchmarkFailure, BenchmarkParameterError, ModelNotFoundError, WrongTypeError
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class AsyncBenchmarkService:
+    """
+        Non-blocking counterpart of stm32_api.benchmark.BenchmarkService.
+        Each wait_for_run() sleeps with asyncio.sleep, so many benchmarks
+        are followed together in one event loop.
+    """
+    def __init__(self, file_manager: AsyncFileManager, version=None) -> None:
+        self.file_manager = file_manager
+        self.client = file_manager.client
+        self.auth_token = file_manager.auth_token
+        self.BENCHMARK_SERVICE_URL = get_benchmark_service_ep()
+        self._use_stringify_args = False
+        self.version = version
+        self.polling_policy = PollingPolicy()
+
+    async def get_supported_versions(self) -> list:
+        return await asyncio.to_thread(get_supported_versions)
+
+    async def trigger_benchmark(self, options: CliParameters, boardName: str, version: str = None):
+        if type(options) != CliParameters:
+            raise WrongTypeError('options should be an instance of CliParameters')
+
+        model_name = options.model if options.model else None
+        data = build_arguments_dict(options, version)
+
+        if not await self.file_manager.has_model(model_name):
+            raise ModelNotFoundError(f"model: {model_name} not found on cloud")
+
+        if self._use_stringify_args:
+            data_to_be_sent = {"args": json.dumps(data), "model": model_name}
+        else:
+            data_to_be_sent = data
+            data_to_be_sent["model"] = model_name
+
+        resp = await self.client.send_post(
+            f'{self.BENCHMARK_SERVICE_URL}/benchmark/{boardName.lower()}',
+            withToken=self.auth_token,
+            usingJson=data_to_be_sent)
+
+        if resp.status_code == 200:
+            json_resp = resp.json()
+            if 'benchmarkId' in json_resp:
+                if 'model' not in json_resp:
+                    logger.warning('No model confirmation in server response')
+                if not bool(json_resp.get('args')):
+                    logger.warning('No args confirmation in server reponse')
+                logger.debug(f'Triggering benchmark {json_resp}')
+                return json_resp['benchmarkId']
+            else:
+                raise BenchmarkFailure(boardName, "Error: server does not reply expected response")
+        else:
+            try:
+                json_resp = resp.json()
+                if 'errors' in json_resp:
+                    raise BenchmarkParameterError(boardName, f"Wrong parameter: {json_resp.get('errors', None)}")
+                else:
+                    raise BenchmarkParameterError(boardName, f"Wrong parameter: {resp.text}")
+            except json.JSONDecodeError:
+                pass
+            raise BenchmarkFailure(boardName, f"Error: server response code is {resp.status_code}")
+
+    async def _get_run(self, benchmarkId: str):
+        resp = await self.client.send_get(
+            f"{self.BENCHMARK_SERVICE_URL}/benchmark/{benchmarkId}", self.auth_token)
+
+        if resp.status_code == 200:
+            return resp.json()
+        # a 404 is raised by send_get(), the other replies are polled again
+        elif resp.status_code == 401:
+            logger.warning(f"Polling benchmark {benchmarkId}: server reply is Unauthorized")
+        else:
+            logger.warning(f"Polling benchmark {benchmarkId}: server response code is {resp.status_code}")
+        return None
+
+    async def _list_runs(self) -> Union[list, None]:
+        resp = await self.client.send_get(f"{self.BENCHMARK_SERVICE_URL}/benchmark/", self.auth_token)
+
+        if resp.status_code == 200:
+            json_resp = resp.json()
+            return json_resp if isinstance(json_resp, list) else None
+        logger.error(f"Error: server response code is: {resp.status_code}")
+        return None
+
+    async def wait_for_run(self, benchmarkId: str, timeout=600, pooling_delay=None,
+                           policy: PollingPolicy = None) -> typing.Tuple[Union[dict, None], dict]:
+        """
+            Wait for a benchmark run to be completed.
+            Returns (result, time spent in each state), result is None on timeout
+            or when the server does not reply an object.
+        """
+        if policy is None:
+            policy = PollingPolicy.fixed(pooling_delay) if pooling_delay is not None else self.polling_policy
+        tracker = StateTracker(policy)
+
+        start_time = time.time()
+        delay = policy.default_interval
+        while True:
+            is_over = (time.time() - start_time) > timeout
+
+            try:
+                result = await self._get_run(benchmarkId)
+            except Exception as e:
+                if not is_retryable_error(e):   # e.g. 404: unknown benchmark id
+                    raise
+                logger.warning(f'Polling benchmark {benchmarkId} failed: {e}')
+                result = None
+
+            if result:
+                if not isinstance(result, dict):
+                    logger.error(f"Error: Message received from server is not an object: {result}")
+                    return None, tracker.finish()
+
+                state = result.get('state', '').lower()
+                delay = tracker.update(state)
+
+                if state == 'done':
+                    durations = tracker.finish()
+                    logger.debug(f'Benchmark({benchmarkId}) done in {tracker.n_polls} polls, '
+                                 f'time per state: {durations}')
+                    return result, durations
+                elif state == 'error':
+                    logger.error(f'Benchmark return an error: {result}')
+                    raise BenchmarkFailure(result.get('board', 'ND'), result.get('message', 'no info'))
+                elif state in STATE_MESSAGES:
+                    logger.debug(f'Benchmark({benchmarkId}) status: {STATE_MESSAGES[state]}')
+                else:
+                    logger.warning(f"Unknown {result.get('state', '')} key received from server")
+
+            if is_over:
+                return None, tracker.finish()
+            await asyncio.sleep(min(delay, max(0.0, timeout - (time.time() - start_time)) + 0.1))
+
+    async def list_boards(self) -> dict:
+        resp = await self.client.send_get(self.BENCHMARK_SERVICE_URL + '/boards', withToken=self.auth_token)
+
+        if resp.status_code == 200:
+            return resp.json()
+        else:
+            logger.error(f"Error: server response code is: {resp.status_code}")
@@ -0,0 +1,111 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import asyncio
+
+from stm32_api.login import LoginManager
+from stm32_api.helper import get_file_service_ep
+from stm32_api.file.model_cache import CloudModelCache
+from stm32_api.file.upload_manifest import UploadManifest, get_file_digest
+from stm32_api.aio.http_requests import AsyncHttpClient
+
+
+class AsyncFileManager:
+    """
+        Non-blocking counterpart of stm32_api.file.FileManager.
+        Requests are sent through `client`, shared with the other async services.
+    """
+    def __init__(self, auth_token: str, client: AsyncHttpClient = None):
+        self.auth_token = auth_token
+        self.client = AsyncHttpClient() if client is None else client
+
+        self.MODEL_FILE_URL = get_file_service_ep() + '/files/models'
+        self.model_cache = CloudModelCache()
+        self.upload_manifest = UploadManifest()
+
+    @classmethod
+    async def login(cls, username: str, password: str, client: AsyncHttpClient = None) -> 'AsyncFileManager':
+        # the SSO login is a one-off chain of redirects, run by the sync LoginManager off the loop
+        login_manager = await asyncio.to_thread(LoginManager, username, password)
+        return cls(login_manager.auth_token, client)
+
+    async def upload_model(self, file_path: str, model_name: str, dedup: bool = True):
+        """ Same as FileManager.upload_model(), returns the name of the model on the cloud """
+        if file_path is None:
+            raise Exception('Please specify the model file path')
+
+        if model_name is None:
+            raise Exception('Please specify the model file name')
+
+        try:
+            digest = await asyncio.to_thread(get_file_digest, file_path)
+            cloud_name = self.upload_manifest.get(digest) if dedup else None
+            if cloud_name is not None and await self.has_model(cloud_name):
+                print(f'Skipped: the model file({model_name}) is already uploaded as {cloud_name}')
+                return cloud_name
+
+            # aiohttp streams the multipart body from the file object
+            with open(file_path, 'rb') as f:
+                resp = await self.client.send_post(
+                    toUrl = self.MODEL_FILE_URL,
+                    withToken = self.auth_token,
+                    usingFile = {'file': (model_name, f)}
+                )
+
+            if resp.status_code == 200:
+                self.model_cache.add(model_name)
+                self.upload_manifest.record(digest, model_name)
+                print(f'Success: the model file({model_name}) is uploaded')
+                return model_name
+            else:
+                print(f'Failed to upload the model file ({model_name})')
+                print(resp.text)
+        except Exception as e:
+            print(e)
+
+    async def delete_model(self, model_name: str):
+        DELETE_MODEL_URL = self.MODEL_FILE_URL + '/' + model_name
+
+        try:
+            resp = await self.client.send_delete(
+                toUrl = DELETE_MODEL_URL,
+                withToken = self.auth_token,
+            )
+
+            if resp.status_code == 200:
+                self.model_cache.discard(model_name)
+                self.upload_manifest.forget(model_name)
+                print(f'Success: the model file({model_name}) is deleted')
+            else:
+                print(f'Failed to delete model file {model_name}')
+                print(resp.text)
+        except Exception as e:
+            print(e)
+
+    async def upload_model_list(self):
+        resp = await self.client.send_get(toUrl=self.MODEL_FILE_URL, withToken=self.auth_token)
+        json_resp = resp.json()
+
+        if isinstance(json_resp, list):
+            self.model_cache.set(model['name'] for model in json_resp if 'name' in model)
+            return json_resp
+        else:
+            return None
+
+    async def get_cloud_models(self, refresh: bool = False) -> set:
+        names = None if refresh else self.model_cache.get()
+        if names is None:
+            models = await self.upload_model_list() or []
+            names = {model['name'] for model in models if 'name' in model}
+        return names
+
+    async def has_model(self, model_name: str) -> bool:
+        names = self.model_cache.get()
+        if names is not None and model_name in names:
+            return True
+        return model_name in await self.get_cloud_models(refresh=True)
@@ -0,0 +1,148 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import os
+import gzip
+import json
+import typing
+import itertools
+
+import aiohttp
+
+from stm32_api.utils.errors import ServerError, ServerRouteNotFound
+from stm32_api.utils.http_requests import get_ssl_verify_status
+
+_part_ids = itertools.count()
+
+
+class AsyncResponse(typing.NamedTuple):
+    """ Status and body of a reply, read before the connection is released """
+    status_code: int
+    text: str
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncHttpClient:
+    """
+        Non-blocking counterpart of stm32_api.utils.http_requests.
+
+        One aiohttp session (and its keep-alive connection pool) is shared by
+        every request sent through the client. It is created on first use, in
+        the running event loop, and must be closed with close() or by using
+        the client as an async context manager.
+    """
+    def __init__(self, limit: int = 100, limit_per_host: int = 32):
+        self.limit = limit                      # connections opened at once
+        self.limit_per_host = limit_per_host    # connections opened at once per host
+        self._session: aiohttp.ClientSession = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ssl=None if get_ssl_verify_status() else False)
+            # trust_env: proxies are read from HTTP(S)_PROXY like requests does
+            self._session = aiohttp.ClientSession(connector=connector, trust_env=True)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncHttpClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @staticmethod
+    def _headers(withToken: str) -> dict:
+        return {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {withToken}",
+        }
+
+    async def send_post(
+            self,
+            toUrl: str,
+            withToken: str,
+            usingData: dict = None,
+            usingFile: dict = None,
+            usingJson=None) -> AsyncResponse:
+        data = usingData
+        if usingFile:
+            # multipart body, files are streamed from their file objects
+            data = aiohttp.FormData()
+            for name, value in (usingData or {}).items():
+                data.add_field(name, str(value))
+            for name, f in usingFile.items():
+                # file object, or (filename, file object) as with requests
+                filename, f = f[:2] if isinstance(f, tuple) else (os.path.basename(getattr(f, 'name', name)), f)
+                data.add_field(name, f, filename=filename)
+
+        async with self.get_session().post(
+                toUrl,
+                headers=self._headers(withToken),
+                data=data,
+                json=usingJson) as resp:
+            return AsyncResponse(resp.status, await resp.text())
+
+    async def send_delete(self, toUrl: str, withToken: str) -> AsyncResponse:
+        async with self.get_session().delete(
+                toUrl,
+                headers=self._headers(withToken)) as resp:
+            return AsyncResponse(resp.status, await resp.text())
+
+    async def send_get(self, toUrl: str, withToken: str, usingParams: dict = None) -> AsyncResponse:
+        async with self.get_session().get(
+                toUrl,
+                headers=self._headers(withToken),
+                params=usingParams) as resp:
+            if resp.status == 404:
+                raise ServerRouteNotFound(f"Trying to reach: {toUrl}")
+            return AsyncResponse(resp.status, await resp.text())
+
+    async def download_to_file(
+            self,
+            toUrl: str,
+            withToken: str,
+            path: str,
+            usingParams: dict = None,
+            compress: bool = False,
+            chunk_size: int = 1 << 16) -> str:
+        """
+            Same as stm32_api.utils.download_to_file(): the body is streamed to
+            a temporary file renamed once complete. Returns the written path.
+        """
+        if compress:
+            path = path + '.gz'
+        tmp_path = f"{path}.{os.getpid()}.{next(_part_ids)}.part"
+
+        async with self.get_session().get(
+                toUrl,
+                headers=self._headers(withToken),
+                params=usingParams) as resp:
+            if resp.status == 404:
+                raise ServerRouteNotFound(f"Trying to reach: {toUrl}")
+            if resp.status != 200:
+                text = await resp.text()
+                raise ServerError(f"GET {toUrl} failed with HTTP code {resp.status}: {text[:200]}")
+            try:
+                with (gzip.open(tmp_path, 'wb') if compress else open(tmp_path, 'wb')) as f:
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return path
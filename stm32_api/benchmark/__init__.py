@@ -1 +1,4 @@
-from .benchmark_manager import BenchmarkManager
\ No newline at end of file
+from .benchmark_manager import BenchmarkManager
+from .benchmark_pipeline import BenchmarkPipeline, BenchmarkJob, get_benchmark_jobs
+from .benchmark_scheduler import BenchmarkScheduler, get_multi_board_jobs, get_board_limits
+from .job_store import JobStore, JobRecord, JOB_STATES
\ No newline at end of file
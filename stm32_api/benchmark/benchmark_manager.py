@@ -11,12 +11,34 @@ import typing
 import functools
 
 from stm32_api.file import FileManager
+from stm32_api.helper import get_benchmark_service_ep
 from stm32_api.benchmark.benchmark_service import BenchmarkService
 
 from stm32_api.utils.errors import BenchmarkServerError
+from stm32_api.utils.http_requests import send_delete, download_to_file
 from stm32_api.utils.types import CliParameters, ValidateResultMetrics, BenchmarkResult, BoardData
 
 
+def check_version(version, supported_versions) -> typing.Optional[str]:
+    """
+        `version` if the Developer Cloud supports it, else the latest supported version
+    """
+    if version is None or version in [v['version'] for v in supported_versions]:
+        return version
+
+    print(
+        f'[WARN] Version {version} is not supported by Developer Cloud.')
+    latest = None
+    for v in supported_versions:    # 240910 
+        if v.get('isLatest', False) == True:
+            latest = v
+    if latest:
+        print(
+            f"[WARN] It will use the latest version by default ({latest['version']})")
+        return latest.get('version', None)
+    return version
+
+
 class BenchmarkManager:
     def __init__(
         self,
@@ -40,35 +62,23 @@ class BenchmarkManager:
 
         self.path = path
 
-        self.BENCHMARK_SERVICE_URL = 'https://stm32ai-cs.st.com/api/benchmark/benchmark/'
-        self.headers = "'Authorization: Bearer " + self.file_manager.auth_token + "'"
+        self.BENCHMARK_SERVICE_URL = get_benchmark_service_ep() + '/benchmark/'
 
         # version check
-        if version != None and version not in list(map(lambda x: x['version'], self.benchmark_service.supportedVersions)):
-            print(
-                f'[WARN] Version {version} is not supported by Developer Cloud.')
-            for v in self.benchmark_service.supportedVersions:    # 240910 
-                if (v.get('isLatest', False) == True):
-                    latest = v
-            if (latest):
-                self.version = latest.get('version', None)
-                print(
-                    f"[WARN] It will use the latest version by default ({latest['version']})")
-                
-        self.version = version
+        self.version = check_version(version, self.benchmark_service.supportedVersions)
 
 
     def delete_result_given_id(self, benchmark_id):
-        curl_command = "curl -X 'DELETE' " + "'" \
-            + self.BENCHMARK_SERVICE_URL + benchmark_id \
-            + "' " + "-H 'accept: application/json' " \
-            + "-H " + self.headers
-        os.system(curl_command)
+        resp = send_delete(self.BENCHMARK_SERVICE_URL + benchmark_id, self.file_manager.auth_token)
+        resp.close()
+        if resp.status_code not in (200, 204):
+            raise BenchmarkServerError(
+                f"Benchmark result {benchmark_id} is not deleted, server response code is {resp.status_code}")
 
         print(f'\nBenchmark result {benchmark_id} is deleted')
 
 
-    def get_result_given_id(self, benchmark_id):
+    def get_result_given_id(self, benchmark_id, compress=False):
         if self.model_name is None:
             fname = benchmark_id + ".json"
         else:
@@ -81,13 +91,14 @@ class BenchmarkManager:
             else:
                 fname = f'{self.model_name.split(".")[0]}.json'
 
-        curl_command = "curl -X 'GET' " + "'" + self.BENCHMARK_SERVICE_URL + benchmark_id \
-            + "' " + "-H 'accept: application/json' " \
-            + "-H " + self.headers \
-            + " | jq '.' > " + self.path + fname
-        os.system(curl_command)
+        result_path = download_to_file(
+            self.BENCHMARK_SERVICE_URL + benchmark_id,
+            self.file_manager.auth_token,
+            os.path.join(self.path, fname),
+            compress=compress)
 
-        print(f'Benchmark result is saved: {self.path}{fname}')
+        print(f'Benchmark result is saved: {result_path}')
+        return result_path
 
 
     def get_all_result(self):
@@ -96,15 +107,14 @@ class BenchmarkManager:
         stamp = datetime.now().strftime(timestamp_format)
 
         all_result_name = "total_result_" + stamp
-        curl_command = "curl -X 'GET' " + "'" + self.BENCHMARK_SERVICE_URL \
-            + "' " + "-H 'accept: application/json' " \
-            + "-H " + self.headers \
-            + " | jq '.' > " + self.path + all_result_name + ".json"
-        os.system(curl_command)
+        all_result_fname = all_result_name + ".json"
 
-        print(f'All benchmark results are saved in {self.path}{all_result_name}.json')
+        download_to_file(
+            self.BENCHMARK_SERVICE_URL,
+            self.file_manager.auth_token,
+            os.path.join(self.path, all_result_fname))
 
-        all_result_fname = all_result_name + ".json"
+        print(f'All benchmark results are saved in {os.path.join(self.path, all_result_fname)}')
 
         return all_result_fname
 
@@ -113,7 +123,7 @@ class BenchmarkManager:
         all_result = self.get_all_result()  
 
         # if deletion == True:    
-        with open(self.path + all_result, 'r') as f:
+        with open(os.path.join(self.path, all_result), 'r') as f:
             all_bench = json.load(f)
 
             benchmark_id_list = []
@@ -128,7 +138,7 @@ class BenchmarkManager:
                     for old_benchmark_id in old_benchmark_id_list:
                         self.delete_result_given_id(old_benchmark_id)
             
-            if (os.path.isfile(self.path + latest_benchmark_id + ".json") == False):
+            if (os.path.isfile(os.path.join(self.path, latest_benchmark_id + ".json")) == False):
                 self.get_result_given_id(latest_benchmark_id)
             else:
                 print("Already saved latest benchmark result.")
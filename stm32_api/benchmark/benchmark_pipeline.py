@@ -0,0 +1,260 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+import os
+import json
+import time
+import typing
+import logging
+import collections
+
+from typing import Dict, Iterator, List, Tuple, Union
+
+from stm32_api.benchmark.benchmark_manager import BenchmarkManager
+from stm32_api.benchmark.polling import BenchmarkCompletion, PollingPolicy
+
+from stm32_api.utils import CliParameters, ServerError, LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class BenchmarkJob(typing.NamedTuple):
+    """ A model to benchmark on a board """
+    model_name: str     # model name on the cloud
+    file_path: str      # local model file to upload
+    board_name: str
+    result_path: str    # where the benchmark result (.json) is saved
+
+
+def get_benchmark_jobs(model_paths: List[str], board_name: str, result_dir: str) -> List[BenchmarkJob]:
+    jobs = []
+    for model_path in model_paths:
+        model_name = os.path.basename(model_path)
+        result_path = os.path.join(result_dir, f'{os.path.splitext(model_name)[0]}.json')
+        jobs.append(BenchmarkJob(model_name, model_path, board_name, result_path))
+    return jobs
+
+
+class BenchmarkPipeline:
+    """
+        Keep up to `max_in_flight` benchmarks running on the cloud at once,
+        and up to `board_limits[board]` on each board.
+
+        Each job is uploaded and triggered as soon as a slot is free, boards
+        are served in turn so that every board keeps its queue full. In-flight
+        benchmarks are followed by one BenchmarkPoller and every result is saved
+        to disk as soon as it is done, then the result is deleted from the cloud.
+        A model file is uploaded once for all its jobs (e.g. one per board) and
+        deleted when the last of them is over.
+
+        With a `job_store` (see JobStore), the state of every job is recorded
+        as it goes: a new pipeline run on the same store skips the saved
+        results and re-attaches to the benchmarks still running on the cloud.
+    """
+    def __init__(
+        self,
+        benchmark_manager: BenchmarkManager,
+        options: dict,
+        max_in_flight: int = 4,
+        timeout: int = 600,
+        pooling_delay: int = None,
+        cleanup: bool = True,
+        use_list_endpoint: bool = False,
+        board_limits: Dict[str, int] = None,
+        job_store=None,
+    ):
+        self.benchmark_manager = benchmark_manager
+        self.file_manager = benchmark_manager.file_manager
+        self.benchmark_service = benchmark_manager.benchmark_service
+
+        self.options = options      # CliParameters arguments except 'model'
+        self.max_in_flight = max_in_flight      # None: no limit but the boards' one
+        self.timeout = timeout
+        self.pooling_delay = pooling_delay      # None: state-aware polling of the benchmark service
+        self.cleanup = cleanup
+        self.use_list_endpoint = use_list_endpoint
+        self.board_limits = {} if board_limits is None else board_limits    # board name -> max in flight
+        self.job_store = job_store
+
+        self._uploaded = {}     # model file path -> name on the cloud
+        self._remaining = collections.Counter()     # model file path -> jobs not over yet
+
+    def _start(self, job: BenchmarkJob) -> str:
+        cloud_name = self._uploaded.get(job.file_path)
+        if cloud_name is None:
+            print(f"Uploading the '{job.model_name}' model file to the STM32 Cloud")
+            # identical files are uploaded once, the benchmark runs on the name they were uploaded with
+            cloud_name = self.file_manager.upload_model(file_path=job.file_path, model_name=job.model_name)
+            if cloud_name is None:
+                raise ServerError(f'Upload of the model file {job.file_path} failed')
+            self._uploaded[job.file_path] = cloud_name
+            self._record(job, 'uploaded', cloud_name=cloud_name)
+
+        bid = self.benchmark_service.trigger_benchmark(
+            CliParameters(model=cloud_name, **self.options),
+            job.board_name,
+            self.benchmark_manager.version)
+        print(f'Benchmark of {job.model_name} on {job.board_name} triggered with id {bid}')
+
+        self.benchmark_manager.bid_list.append(bid)
+        self._record(job, 'triggered', benchmark_id=bid, cloud_name=cloud_name)
+        return bid
+
+    def _record(self, job: BenchmarkJob, state: str, **fields):
+        if self.job_store is not None:
+            self.job_store.set_state(job, state, **fields)
+
+    def _save(self, job: BenchmarkJob, result: dict) -> str:
+        result_dir = os.path.dirname(job.result_path)
+        if result_dir and not os.path.exists(result_dir):
+            os.makedirs(result_dir, exist_ok=True)
+
+        tmp_path = f'{job.result_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        os.replace(tmp_path, job.result_path)
+
+        print(f'Benchmark result is saved: {job.result_path}')
+        return job.result_path
+
+    def _cleanup(self, job: BenchmarkJob, bid: str, saved: bool = True):
+        if self.cleanup:
+            try:
+                self.benchmark_manager.delete_result_given_id(bid)
+                if saved:
+                    self._record(job, 'cleaned')
+            except Exception as e:
+                logger.warning(f'Cleanup of benchmark {bid} failed: {e}')
+        self._release(job)
+
+    def _release(self, job: BenchmarkJob):
+        # the model is deleted from the cloud once no job needs it anymore
+        self._remaining[job.file_path] -= 1
+        if self._remaining[job.file_path] > 0:
+            return
+        del self._remaining[job.file_path]
+        cloud_name = self._uploaded.pop(job.file_path, None)
+        # the name may also be the upload of another (identical) file that is still in use
+        if cloud_name in self._uploaded.values():
+            return
+        if self.cleanup and cloud_name is not None:
+            try:
+                self.file_manager.delete_model(cloud_name)
+            except Exception as e:
+                logger.warning(f'Deletion of the model {cloud_name} failed: {e}')
+
+    def _finish(self, job: BenchmarkJob, completion: BenchmarkCompletion) -> Union[str, Exception]:
+        if completion.error is not None:
+            self._record(job, 'failed', error=str(completion.error))
+            return completion.error
+        logger.debug(f'Benchmark({completion.benchmark_id}) time per state: {completion.state_durations}')
+        self._record(job, 'done')
+        try:
+            result_path = self._save(job, completion.result)
+        except Exception as e:
+            self._record(job, 'failed', error=str(e))
+            return e
+        self._record(job, 'downloaded')
+        return result_path
+
+    def _resume(self, jobs: List[BenchmarkJob]):
+        """
+            Sort the jobs by their state in the job store:
+            (saved and cleaned up, saved but not cleaned up, running on the cloud, to start)
+        """
+        if self.job_store is None:
+            return [], [], [], list(jobs)
+        self.job_store.add_jobs(jobs)
+
+        done, saved, running, todo = [], [], [], []
+        for job in jobs:
+            record = self.job_store.get(job)
+            if record.state in ('downloaded', 'cleaned') and os.path.exists(job.result_path):
+                (done if record.state == 'cleaned' or not record.benchmark_id else saved).append(record)
+            elif record.state in ('triggered', 'done') and record.benchmark_id:
+                running.append(record)
+            else:
+                todo.append(job)
+        return done, saved, running, todo
+
+    def _is_full(self, in_flight: dict) -> bool:
+        return self.max_in_flight is not None and len(in_flight) >= self.max_in_flight
+
+    def iter_results(self, jobs: List[BenchmarkJob]) -> Iterator[Tuple[BenchmarkJob, Union[str, Exception]]]:
+        """
+            Yield (job, result path) as each benchmark finishes, or (job, exception)
+            when it fails. Failures do not stop the other jobs.
+        """
+        done, saved, resumed, todo = self._resume(jobs)
+        for record in saved + resumed:
+            self._remaining[record.job.file_path] += 1
+            if record.cloud_name:
+                self._uploaded.setdefault(record.job.file_path, record.cloud_name)
+
+        pending = collections.OrderedDict()     # board name -> jobs to start
+        for job in todo:
+            pending.setdefault(job.board_name, collections.deque()).append(job)
+            self._remaining[job.file_path] += 1
+        running = collections.Counter()         # board name -> benchmarks in flight
+        in_flight = {}      # benchmark id -> job
+        poller = self.benchmark_service.poll_many(
+            timeout=self.timeout,
+            policy=PollingPolicy.fixed(self.pooling_delay) if self.pooling_delay is not None else None,
+            use_list_endpoint=self.use_list_endpoint)
+
+        # results saved by a previous run
+        for record in done:
+            yield record.job, record.job.result_path
+        for record in saved:
+            self._cleanup(record.job, record.benchmark_id)
+            yield record.job, record.job.result_path
+        # benchmarks triggered by a previous run
+        for record in resumed:
+            print(f'Benchmark of {record.job.model_name} on {record.job.board_name} resumed with id {record.benchmark_id}')
+            in_flight[record.benchmark_id] = record.job
+            running[record.job.board_name] += 1
+            poller.add(record.benchmark_id)
+
+        while pending or in_flight:
+            # one job per board and per round, until the boards or the pipeline are full
+            started = True
+            while started and pending and not self._is_full(in_flight):
+                started = False
+                for board_name in list(pending):
+                    if self._is_full(in_flight):
+                        break
+                    if running[board_name] >= max(1, self.board_limits.get(board_name, float('inf'))):
+                        continue
+                    job = pending[board_name].popleft()
+                    if not pending[board_name]:
+                        del pending[board_name]
+                    started = True
+                    try:
+                        bid = self._start(job)
+                    except Exception as e:
+                        print(f'Error: {job.model_name} on {job.board_name}: {e}')
+                        self._record(job, 'failed', error=str(e))
+                        self._release(job)
+                        yield job, e
+                        continue
+                    in_flight[bid] = job
+                    running[board_name] += 1
+                    poller.add(bid)
+
+            completions = poller.poll()
+            for completion in completions:
+                job = in_flight.pop(completion.benchmark_id)
+                running[job.board_name] -= 1
+                outcome = self._finish(job, completion)
+                self._cleanup(job, completion.benchmark_id, saved=not isinstance(outcome, Exception))
+                yield job, outcome
+
+            if in_flight and not completions:
+                time.sleep(poller.next_poll_delay())
+
+    def run(self, jobs: List[BenchmarkJob]) -> List[Tuple[BenchmarkJob, Union[str, Exception]]]:
+        return list(self.iter_results(jobs))
@@ -0,0 +1,94 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import os
+import logging
+
+from typing import Dict, Iterator, List, Tuple, Union
+
+from stm32_api.benchmark.benchmark_manager import BenchmarkManager
+from stm32_api.benchmark.benchmark_pipeline import BenchmarkPipeline, BenchmarkJob, get_benchmark_jobs
+
+from stm32_api.utils import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def get_multi_board_jobs(model_paths: List[str], board_names: List[str], result_dir: str) -> List[BenchmarkJob]:
+    """ Every model on every board, results are saved in result_dir/<board name>/ """
+    jobs = []
+    for board_name in board_names:
+        jobs.extend(get_benchmark_jobs(model_paths, board_name, os.path.join(result_dir, board_name)))
+    return jobs
+
+
+def get_board_limits(
+    benchmark_manager: BenchmarkManager,
+    board_names: List[str],
+    max_per_board: int = None,
+    queued_per_board: int = 1,
+) -> Dict[str, int]:
+    """
+        Number of benchmarks to keep in flight on each board: the number of
+        boards of this type on the cloud (boardCount) plus `queued_per_board`
+        waiting in the cloud queue, capped by `max_per_board`.
+
+        The queued benchmarks start as soon as a board is free, instead of
+        waiting for the next poll to see the end of a running one.
+    """
+    boards = {board.name.lower(): board for board in benchmark_manager.get_benchmark_boards()}
+
+    limits = {}
+    for board_name in board_names:
+        board = boards.get(board_name.lower())
+        if board is None:
+            logger.warning(f'Board {board_name} is not listed by the benchmark service')
+            count = 1
+        else:
+            count = board.boardCount if board.boardCount > 0 else 1
+        count += max(0, queued_per_board)
+        if max_per_board is not None:
+            count = min(count, max_per_board)
+        limits[board_name] = max(1, count)
+    return limits
+
+
+class BenchmarkScheduler(BenchmarkPipeline):
+    """
+        Benchmark a set of models on a set of boards in one campaign.
+
+        Each board gets as many benchmarks in flight as it has copies on the
+        cloud plus `queued_per_board` waiting in the cloud queue (see
+        get_board_limits), and its queue is refilled as soon as one of them
+        is over. A model is uploaded once for all the boards.
+    """
+    def __init__(
+        self,
+        benchmark_manager: BenchmarkManager,
+        options: dict,
+        board_names: List[str],
+        max_per_board: int = None,
+        max_in_flight: int = None,
+        board_limits: Dict[str, int] = None,
+        queued_per_board: int = 1,
+        **kwargs,
+    ):
+        if board_limits is None:
+            board_limits = get_board_limits(benchmark_manager, board_names, max_per_board, queued_per_board)
+        super().__init__(benchmark_manager, options, max_in_flight=max_in_flight, board_limits=board_limits, **kwargs)
+        self.board_names = board_names
+
+    def get_jobs(self, model_paths: List[str], result_dir: str) -> List[BenchmarkJob]:
+        return get_multi_board_jobs(model_paths, self.board_names, result_dir)
+
+    def iter_campaign(self, model_paths: List[str], result_dir: str) -> Iterator[Tuple[BenchmarkJob, Union[str, Exception]]]:
+        logger.debug(f'Benchmarks in flight per board: {self.board_limits}')
+        return self.iter_results(self.get_jobs(model_paths, result_dir))
+
+    def run_campaign(self, model_paths: List[str], result_dir: str) -> List[Tuple[BenchmarkJob, Union[str, Exception]]]:
+        return list(self.iter_campaign(model_paths, result_dir))
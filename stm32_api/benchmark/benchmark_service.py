@@ -14,7 +14,8 @@ import logging
 from typing import Union
 
 from stm32_api.file import FileManager
-from stm32_api.helper import get_supported_versions
+from stm32_api.helper import get_supported_versions, get_benchmark_service_ep
+from stm32_api.benchmark.polling import PollingPolicy, StateTracker, BenchmarkPoller, STATE_MESSAGES
 
 from stm32_api.utils import send_post, send_get
 from stm32_api.utils import CliParameterVerbosity, CliParameters, AtonParametersSchema, CliParameterType, LOGGER_NAME
@@ -23,49 +24,49 @@ from stm32_api.utils import BenchmarkFailure, BenchmarkParameterError, ModelNotF
 
 logger = logging.getLogger(LOGGER_NAME)
 
+def build_arguments_dict(options: CliParameters, version: str = None) -> dict:
+    """ CliParameters -> body of a benchmark request (without the model) """
+    data = {}
+
+    for field in options._fields:
+        current_value = getattr(options, field)
+        if field in ['model', 'output', 'atonnOptions'] or current_value is None:
+            continue
+        if version:
+            data['version'] = version
+        try: 
+            data[field] = current_value.value
+        except Exception as _:
+            if current_value is not None:
+                data[field] = current_value
+    if (hasattr(options, 'atonnOptions')):
+        data['atonnOptions'] = AtonParametersSchema().dump(options.atonnOptions)
+    return data
+
+
 class BenchmarkService:
     def __init__(self, file_manager: FileManager, version=None) -> None:
         self.file_manager = file_manager
         self.auth_token = file_manager.auth_token
-        self.BENCHMARK_SERVICE_URL = 'https://stm32ai-cs.st.com/api/benchmark'
+        self.BENCHMARK_SERVICE_URL = get_benchmark_service_ep()
         self._use_stringify_args = False
         self.version = version
+        self.polling_policy = PollingPolicy()
+        self.benchmark_state = None
+        self.state_durations = {}
 
-        # supported versions
-        VERSIONS_URL = 'https://stm32ai-cs.st.com/assets/versions.json'
-        self.supportedVersions = get_supported_versions(VERSIONS_URL)
+        # supported versions, cached for every service of the process (see get_supported_versions)
+        self.supportedVersions = get_supported_versions()
 
     def trigger_benchmark(self, options: CliParameters, boardName: str, version: str = None):
         if type(options) != CliParameters:
             raise WrongTypeError('options should be an instance of CliParameters')
 
-        def _build_arguments_dict(options: CliParameters):
-            data = {}
-
-            for field in options._fields:
-                current_value = getattr(options, field)
-                if field in ['model', 'output', 'atonnOptions'] or current_value is None:
-                    continue
-                if version:
-                    data['version'] = version
-                try: 
-                    data[field] = current_value.value
-                except Exception as _:
-                    if current_value is not None:
-                        data[field] = current_value
-            if (hasattr(options, 'atonnOptions')):
-                data['atonnOptions'] = AtonParametersSchema().dump(options.atonnOptions)
-            return data
-        
         model_name = options.model if options.model else None
-        data = _build_arguments_dict(options)
-
-        cloud_models_info = self.file_manager.upload_model_list()
-        cloud_models = []
-        for model in cloud_models_info:
-            cloud_models.append(model['name'])
-        
-        if model_name not in cloud_models:
+        data = build_arguments_dict(options, version)
+
+        # cached listing of the cloud storage, listed again only if the model is missing
+        if not self.file_manager.has_model(model_name):
             raise ModelNotFoundError(f"model: {model_name} not found on cloud")
 
         if self._use_stringify_args:
@@ -93,18 +94,18 @@ class BenchmarkService:
                 logger.debug(f'Triggering benchmark {json_resp}')
                 return json_resp['benchmarkId']
             else:
-                raise BenchmarkFailure("Error: server does not reply expected \
+                raise BenchmarkFailure(boardName, "Error: server does not reply expected \
                     response")
         else:
             try:
                 json_resp = resp.json()
                 if 'errors' in json_resp:
-                    raise BenchmarkParameterError(f"Wrong parameter: {json_resp.get('errors', None)}")
+                    raise BenchmarkParameterError(boardName, f"Wrong parameter: {json_resp.get('errors', None)}")
                 else:
-                    raise BenchmarkParameterError(f"Wrong parameter: {resp.text}")
+                    raise BenchmarkParameterError(boardName, f"Wrong parameter: {resp.text}")
             except json.JSONDecodeError:
                 pass
-            raise BenchmarkFailure(f"Error: server response code is {resp.status_code}")
+            raise BenchmarkFailure(boardName, f"Error: server response code is {resp.status_code}")
 
     def _get_run(self, benchmarkId: str):
         resp = send_get(f"{self.BENCHMARK_SERVICE_URL}/benchmark/{benchmarkId}", 
@@ -119,14 +120,45 @@ class BenchmarkService:
                 {resp.status_code}")
         return None
 
-    def wait_for_run(self, benchmarkId: str, timeout=600, pooling_delay=2):
+    def _list_runs(self) -> Union[list, None]:
+        resp = send_get(f"{self.BENCHMARK_SERVICE_URL}/benchmark/", self.auth_token)
+
+        if resp.status_code == 200:
+            json_resp = resp.json()
+            resp.close()
+            return json_resp if isinstance(json_resp, list) else None
+        logger.error(f"Error: server response code is: {resp.status_code}")
+        return None
+
+    def poll_many(self, benchmarkIds: typing.Iterable[str] = (), timeout=600,
+                  policy: PollingPolicy = None, use_list_endpoint=False) -> BenchmarkPoller:
+        """
+            Follow several benchmarks at once. Iterating over the returned
+            poller yields a BenchmarkCompletion as each benchmark is over.
+        """
+        poller = BenchmarkPoller(self, policy=policy, timeout=timeout, use_list_endpoint=use_list_endpoint)
+        for benchmarkId in benchmarkIds:
+            poller.add(benchmarkId)
+        return poller
+
+    def wait_for_run(self, benchmarkId: str, timeout=600, pooling_delay=None, policy: PollingPolicy = None):
         """
             Wait for a benchmark run to be completed.
             If no result until timeoutit returns None
+
+            Polls are spaced by `policy` (self.polling_policy by default), or
+            every `pooling_delay` seconds when it is given.
+            Time spent in each state is kept in self.state_durations.
         """
+        if policy is None:
+            policy = PollingPolicy.fixed(pooling_delay) if pooling_delay is not None else self.polling_policy
+        tracker = StateTracker(policy)
+
         start_time = time.time()
         is_over = False
         self.benchmark_state = None
+        self.state_durations = tracker.state_durations
+        delay = policy.default_interval
         while not is_over:
             if (time.time() - start_time) > timeout:
                 is_over = True
@@ -134,49 +166,31 @@ class BenchmarkService:
             result = self._get_run(benchmarkId)
             if result:
                 if isinstance(result, dict):
-                    self.benchmark_state = result.get('state', '').lower()
-                    if result.get('state', '').lower() == 'done':
+                    state = result.get('state', '').lower()
+                    self.benchmark_state = state
+                    delay = tracker.update(state)
+
+                    if state == 'done':
+                        tracker.finish()
+                        logger.debug(f'Benchmark({benchmarkId}) done in {tracker.n_polls} polls, '
+                                     f'time per state: {self.state_durations}')
                         return result
-                    elif result.get('state', '').lower() == 'error':
+                    elif state == 'error':
                         logger.error(f'Benchmark return an error: {result}')
                         raise BenchmarkFailure(result.get('board', 'ND'),
                                                result.get('message', 'no info')
                                                )
-                    elif result.get('state', '').lower() == 'waiting_for_build':
-                        logger.debug(f'Benchmark({benchmarkId}) status: Project \
-                            is waiting for build')
-                    elif result.get('state', '').lower() == 'in_queue':
-                        logger.debug(f'Benchmark({benchmarkId}) status: Model \
-                            is in queue')
-                    elif result.get('state', '').lower() == 'flashing':
-                        logger.debug(f'Benchmark({benchmarkId}) status: \
-                            Flashing remote board')
-                    elif result.get('state', '').lower() == \
-                            'generating_sources':
-                        logger.debug(f'Benchmark({benchmarkId}) status: \
-                            Generating sources')
-                    elif result.get('state', '').lower() == \
-                        'copying_sources':
-                        logger.debug(f'Benchmark({benchmarkId}) status: \
-                            Copying sources')
-                    elif result.get('state', '').lower() == 'loading_sources':
-                        logger.debug(f'Benchmark({benchmarkId}) status: \
-                            Loading sources')
-                    elif result.get('state', '').lower() == 'building':
-                        logger.debug(f'Benchmark({benchmarkId}) status: \
-                            Building sources')
-                    elif result.get('state', '').lower() == 'validation':
-                        logger.debug(f'Benchmark({benchmarkId}) status: \
-                            Validating model')
+                    elif state in STATE_MESSAGES:
+                        logger.debug(f'Benchmark({benchmarkId}) status: {STATE_MESSAGES[state]}')
                     else:
-                        logger.warn(f"Unknown {result.get('state', '')} key \
-                            received from server")
+                        logger.warning(f"Unknown {result.get('state', '')} key received from server")
                 else:
                     logger.error("Error: Message received from server is not \
                         an object: ", result)
                     return None
 
-            time.sleep(pooling_delay)
+            if not is_over:
+                time.sleep(min(delay, max(0.0, timeout - (time.time() - start_time)) + 0.1))
 
     def list_boards(self) -> dict:
         resp = send_get(
@@ -0,0 +1,127 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import time
+import typing
+import sqlite3
+import threading
+
+from typing import Dict, Iterable, Iterator, Optional
+
+from stm32_api.benchmark.benchmark_pipeline import BenchmarkJob
+
+# life of a job, in order. 'failed' jobs are started again by the next run.
+JOB_STATES = ('pending', 'uploaded', 'triggered', 'done', 'downloaded', 'cleaned', 'failed')
+
+
+class JobRecord(typing.NamedTuple):
+    """ Stored state of a BenchmarkJob """
+    job: BenchmarkJob
+    state: str
+    benchmark_id: Optional[str]
+    cloud_name: Optional[str]   # name of the model on the cloud
+    error: Optional[str]
+    updated_at: float
+
+
+class JobStore:
+    """
+        Durable record of the jobs of a benchmark campaign, in a SQLite file.
+
+        Every state change is committed at once, so a runner restarted after
+        a crash knows which benchmarks are already saved and which ones are
+        still running on the cloud (with their benchmark id) and re-attaches
+        to them instead of benchmarking the models again.
+        Jobs are identified by their result path.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' result_path TEXT PRIMARY KEY,'
+                ' model_name TEXT NOT NULL,'
+                ' file_path TEXT NOT NULL,'
+                ' board_name TEXT NOT NULL,'
+                ' state TEXT NOT NULL,'
+                ' benchmark_id TEXT,'
+                ' cloud_name TEXT,'
+                ' error TEXT,'
+                ' updated_at REAL NOT NULL)')
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self) -> 'JobStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _to_record(row) -> JobRecord:
+        result_path, model_name, file_path, board_name, state, benchmark_id, cloud_name, error, updated_at = row
+        job = BenchmarkJob(model_name, file_path, board_name, result_path)
+        return JobRecord(job, state, benchmark_id, cloud_name, error, updated_at)
+
+    def add_jobs(self, jobs: Iterable[BenchmarkJob]):
+        """ Record new jobs as pending, jobs already in the store are kept as they are """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO jobs'
+                ' (result_path, model_name, file_path, board_name, state, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                [(job.result_path, job.model_name, job.file_path, job.board_name, 'pending', now) for job in jobs])
+
+    def get(self, job: BenchmarkJob) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result_path, model_name, file_path, board_name, state, benchmark_id, cloud_name, error, updated_at'
+                ' FROM jobs WHERE result_path = ?', (job.result_path,)).fetchone()
+        return None if row is None else self._to_record(row)
+
+    def set_state(self, job: BenchmarkJob, state: str, **fields):
+        """ Change the state of a job, `fields` among benchmark_id, cloud_name and error """
+        if state not in JOB_STATES:
+            raise ValueError(f'unknown job state: {state}')
+        unknown = set(fields) - {'benchmark_id', 'cloud_name', 'error'}
+        if unknown:
+            raise ValueError(f'unknown job fields: {sorted(unknown)}')
+
+        if state != 'failed':
+            fields.setdefault('error', None)
+        columns = ['state', 'updated_at'] + list(fields)
+        values = [state, time.time()] + list(fields.values())
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO jobs'
+                ' (result_path, model_name, file_path, board_name, state, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (job.result_path, job.model_name, job.file_path, job.board_name, state, values[1]))
+            self._conn.execute(
+                f'UPDATE jobs SET {", ".join(f"{c} = ?" for c in columns)} WHERE result_path = ?',
+                values + [job.result_path])
+
+    def iter_records(self, *states: str) -> Iterator[JobRecord]:
+        """ Records of the jobs in one of `states` (all the jobs by default) """
+        query = 'SELECT result_path, model_name, file_path, board_name, state, benchmark_id, cloud_name, error, updated_at FROM jobs'
+        params = ()
+        if states:
+            query += f' WHERE state IN ({", ".join("?" * len(states))})'
+            params = states
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY rowid', params).fetchall()
+        for row in rows:
+            yield self._to_record(row)
+
+    def count_by_state(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
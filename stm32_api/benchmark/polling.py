@@ -0,0 +1,260 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+import time
+import typing
+import random
+import logging
+
+from typing import Dict, Iterator, List, Optional, Union
+
+from stm32_api.utils import BenchmarkFailure, ServerRouteNotFound, LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# benchmark state -> status message
+STATE_MESSAGES = {
+    'waiting_for_build': 'Project is waiting for build',
+    'in_queue': 'Model is in queue',
+    'generating_sources': 'Generating sources',
+    'copying_sources': 'Copying sources',
+    'loading_sources': 'Loading sources',
+    'building': 'Building sources',
+    'flashing': 'Flashing remote board',
+    'validation': 'Validating model',
+}
+
+TERMINAL_STATES = ('done', 'error')
+
+# benchmark state -> first delay (s) between two polls in this state
+# Jobs wait minutes in the queue and for the build, but validation is over in seconds.
+STATE_POLL_INTERVALS = {
+    'waiting_for_build': 5,
+    'in_queue': 5,
+    'generating_sources': 3,
+    'copying_sources': 2,
+    'loading_sources': 2,
+    'building': 4,
+    'flashing': 2,
+    'validation': 1,
+}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+        Only a 404 (unknown or purged benchmark id) ends the benchmark. Network
+        errors and other replies, e.g. a 401 of an expired token or a 5xx, are
+        retried on the next poll.
+    """
+    return not isinstance(error, ServerRouteNotFound)
+
+
+class PollingPolicy:
+    """
+        Delay before the next poll of a benchmark.
+
+        The delay starts from the interval of the current state and grows by
+        `backoff` at every poll that sees the same state, up to `max_interval`.
+        A random `jitter` (fraction of the delay) spreads the polls of many jobs.
+    """
+    def __init__(
+        self,
+        intervals: Dict[str, float] = None,
+        default_interval: float = 2,
+        backoff: float = 1.5,
+        max_interval: float = 30,
+        jitter: float = 0.1,
+    ):
+        self.intervals = STATE_POLL_INTERVALS if intervals is None else intervals
+        self.default_interval = default_interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    @classmethod
+    def fixed(cls, interval: float) -> 'PollingPolicy':
+        return cls(intervals={}, default_interval=interval, backoff=1, max_interval=interval, jitter=0)
+
+    def get_delay(self, state: str, polls_in_state: int) -> float:
+        interval = self.intervals.get(state, self.default_interval)
+        delay = min(interval * (self.backoff ** polls_in_state), max(self.max_interval, interval))
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return delay
+
+
+class StateTracker:
+    """
+        Follow the states reported for one benchmark: time spent in each state
+        and delay before the next poll.
+    """
+    def __init__(self, policy: PollingPolicy):
+        self.policy = policy
+        self.state = None
+        self.state_since = None
+        self.polls_in_state = 0
+        self.state_durations: Dict[str, float] = {}     # state -> seconds
+        self.n_polls = 0
+
+    def update(self, state: str, now: float = None) -> float:
+        """ Record a polled state, returns the delay (s) before the next poll """
+        now = time.time() if now is None else now
+        self.n_polls += 1
+
+        if state != self.state:
+            self._close_state(now)
+            self.state = state
+            self.state_since = now
+            self.polls_in_state = 0
+        else:
+            self.polls_in_state += 1
+
+        return self.policy.get_delay(state, self.polls_in_state)
+
+    def _close_state(self, now: float):
+        if self.state is not None:
+            self.state_durations[self.state] = \
+                self.state_durations.get(self.state, 0.0) + (now - self.state_since)
+            self.state_since = now
+
+    def finish(self, now: float = None) -> Dict[str, float]:
+        if self.state not in TERMINAL_STATES:
+            self._close_state(time.time() if now is None else now)
+        return self.state_durations
+
+
+class BenchmarkCompletion(typing.NamedTuple):
+    """ Outcome of a benchmark followed by a BenchmarkPoller """
+    benchmark_id: str
+    state: str                  # 'done', 'error', 'failed' (e.g. unknown id) or 'timeout'
+    result: Optional[dict]      # server reply, None on failure or timeout
+    error: Optional[Exception]
+    state_durations: Dict[str, float]
+
+
+class BenchmarkPoller:
+    """
+        Follow many benchmark ids from a single thread.
+
+        Every call to poll() checks the ids that are due (per their state and
+        `policy`) in one pass and returns the benchmarks that are over. With
+        `use_list_endpoint`, one request to the list of benchmarks gives the
+        state of every id and the full reply is only fetched for finished ones.
+        Ids can be added while iterating.
+    """
+    def __init__(
+        self,
+        benchmark_service,
+        policy: PollingPolicy = None,
+        timeout: float = 600,
+        use_list_endpoint: bool = False,
+    ):
+        self.benchmark_service = benchmark_service
+        self.policy = benchmark_service.polling_policy if policy is None else policy
+        self.timeout = timeout
+        self.use_list_endpoint = use_list_endpoint
+
+        # benchmark id -> [tracker, start time, next poll time]
+        self._jobs: Dict[str, list] = {}
+
+    def add(self, benchmark_id: str):
+        now = time.time()
+        self._jobs[benchmark_id] = [StateTracker(self.policy), now, now]
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, benchmark_id: str) -> bool:
+        return benchmark_id in self._jobs
+
+    def next_poll_delay(self) -> float:
+        if not self._jobs:
+            return 0.0
+        return max(0.0, min(job[2] for job in self._jobs.values()) - time.time())
+
+    def _get_states(self, benchmark_ids: List[str]) -> Dict[str, Union[dict, Exception, None]]:
+        if self.use_list_endpoint:
+            try:
+                runs = self.benchmark_service._list_runs()
+            except Exception as e:
+                logger.warning(f'Listing benchmarks failed: {e}')
+                runs = None
+            if runs is not None:
+                by_id = {run.get('benchmarkId'): run for run in runs if isinstance(run, dict)}
+                # the list may lack some ids (or their state), those are asked one by one
+                return {bid: by_id[bid] if 'state' in by_id.get(bid, {}) else self._get_run(bid)
+                        for bid in benchmark_ids}
+        return {bid: self._get_run(bid) for bid in benchmark_ids}
+
+    def _get_run(self, benchmark_id: str) -> Union[dict, Exception, None]:
+        """ Server reply, None to retry on the next poll, or the error that ends the benchmark """
+        try:
+            return self.benchmark_service._get_run(benchmark_id)
+        except Exception as e:
+            if not is_retryable_error(e):
+                return e
+            logger.warning(f'Polling benchmark {benchmark_id} failed: {e}')
+            return None
+
+    def poll(self) -> List[BenchmarkCompletion]:
+        now = time.time()
+        if self.use_list_endpoint:
+            due = list(self._jobs) if any(job[2] <= now for job in self._jobs.values()) else []
+        else:
+            due = [bid for bid, job in self._jobs.items() if job[2] <= now]
+        if not due:
+            return []
+
+        completions = []
+        for bid, result in self._get_states(due).items():
+            tracker, start_time, _ = self._jobs[bid]
+            now = time.time()
+            state = result.get('state', '').lower() if isinstance(result, dict) else None
+
+            if state == 'done' and self.use_list_endpoint:
+                result = self._get_run(bid)     # the list only gives a summary of each benchmark
+                if not isinstance(result, dict):
+                    state = None
+
+            if isinstance(result, Exception):
+                logger.error(f'Polling benchmark {bid} failed: {result}')
+                completion = BenchmarkCompletion(bid, 'failed', None, result, tracker.finish(now))
+                del self._jobs[bid]
+                completions.append(completion)
+                continue
+
+            if state is not None:
+                delay = tracker.update(state, now)
+            else:
+                delay = self.policy.default_interval
+
+            if state == 'done':
+                completion = BenchmarkCompletion(bid, 'done', result, None, tracker.finish(now))
+            elif state == 'error':
+                logger.error(f'Benchmark return an error: {result}')
+                error = BenchmarkFailure(result.get('board', 'ND'), result.get('message', 'no info'))
+                completion = BenchmarkCompletion(bid, 'error', result, error, tracker.finish(now))
+            elif (now - start_time) > self.timeout:
+                error = TimeoutError(f'Benchmark {bid} is not done after {self.timeout}s (state: {state})')
+                completion = BenchmarkCompletion(bid, 'timeout', None, error, tracker.finish(now))
+            else:
+                if state is not None and state not in STATE_MESSAGES:
+                    logger.warning(f"Unknown {result.get('state', '')} key received from server")
+                self._jobs[bid][2] = now + delay
+                continue
+
+            del self._jobs[bid]
+            completions.append(completion)
+        return completions
+
+    def __iter__(self) -> Iterator[BenchmarkCompletion]:
+        """ Yield completions until no benchmark is left """
+        while self._jobs:
+            completions = self.poll()
+            yield from completions
+            if self._jobs and not completions:
+                time.sleep(self.next_poll_delay())
@@ -0,0 +1,513 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+"""
+    Local stand-in for the STM32 Cloud backend, for offline tests.
+
+    It serves the versions, login (SSO + token), file, benchmark and boards
+    routes used by stm32_api, with simulated boards: each board type runs
+    `boardCount` benchmarks at once, the others wait in its queue, and each
+    benchmark goes through the states of STATE_MESSAGES with configurable
+    dwell times. Errors can be injected at random.
+
+    python -m stm32_api.fake_cloud --port 8000
+    then export the printed variables to route stm32_api to the fake server.
+"""
+
+import re
+import json
+import time
+import uuid
+import heapq
+import base64
+import random
+import typing
+import argparse
+import threading
+import collections
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Callable, Dict, List, Optional, Tuple
+
+from stm32_api.benchmark.polling import STATE_MESSAGES
+from stm32_api.utils.endpoints import BACKEND_EV_NAME
+
+# states of a benchmark once it leaves the queue, in order
+RUN_STATES = ('generating_sources', 'copying_sources', 'loading_sources', 'building', 'flashing', 'validation')
+
+# seconds spent in each state
+DEFAULT_DWELL_TIMES = {
+    'generating_sources': 0.5,
+    'copying_sources': 0.1,
+    'loading_sources': 0.1,
+    'building': 1.0,
+    'flashing': 0.3,
+    'validation': 0.5,
+}
+
+DEFAULT_BOARDS = {
+    'STM32F769I-DISCO': {'boardCount': 2, 'flashSize': '2048', 'deviceCpu': 'Cortex-M7', 'deviceId': '0x451'},
+    'STM32H747I-DISCO': {'boardCount': 3, 'flashSize': '2048', 'deviceCpu': 'Cortex-M7', 'deviceId': '0x450'},
+    'NUCLEO-H743ZI2': {'boardCount': 1, 'flashSize': '2048', 'deviceCpu': 'Cortex-M7', 'deviceId': '0x450'},
+}
+
+DEFAULT_VERSIONS = [
+    {'version': '9.0.0', 'isLatest': False},
+    {'version': '9.1.0', 'isLatest': True},
+]
+
+FAKE_TOKEN_TTL = 3600
+
+
+class FakeCloudConfig(typing.NamedTuple):
+    """ Behaviour of the simulated backend """
+    boards: Dict[str, dict] = DEFAULT_BOARDS
+    dwell_times: Dict[str, float] = DEFAULT_DWELL_TIMES
+    queue_depth: Optional[int] = None   # benchmarks waiting per board type, more are rejected (HTTP 503)
+    error_rate: float = 0.0             # probability that a benchmark ends in the 'error' state
+    http_error_rate: float = 0.0        # probability that a file/benchmark request fails with HTTP 500
+    response_delay: float = 0.0         # seconds added to every reply
+    versions: List[dict] = DEFAULT_VERSIONS
+    require_auth: bool = True
+    seed: Optional[int] = None
+    # benchmark reply of a finished run, see FakeCloud.get_result()
+    result_factory: Optional[Callable[[dict], dict]] = None
+
+
+class _Run:
+    """ A triggered benchmark, its timeline is fixed when it is scheduled """
+    def __init__(self, benchmark_id: str, model: str, board: str, args: dict, created: float):
+        self.benchmark_id = benchmark_id
+        self.model = model
+        self.board = board
+        self.args = args
+        self.created = created
+        self.start = created            # leaves the queue
+        self.state_ends: List[float] = []   # end time of each of RUN_STATES
+        self.error_state: Optional[str] = None
+
+
+def _make_token(ttl: float = FAKE_TOKEN_TTL) -> dict:
+    # unsigned JWT: only the expiry claim matters to the client
+    def _b64(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+    access_token = f"{_b64({'alg': 'none'})}.{_b64({'exp': int(time.time() + ttl), 'jti': uuid.uuid4().hex})}.fake"
+    return {
+        'access_token': access_token,
+        'refresh_token': uuid.uuid4().hex,
+        'expires_in': ttl,
+        'token_type': 'Bearer',
+    }
+
+
+class FakeCloud:
+    """ State of the simulated backend, independent of HTTP """
+    def __init__(self, config: FakeCloudConfig = None):
+        self.config = FakeCloudConfig() if config is None else config
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+
+        self.models: Dict[str, int] = {}        # model name -> size (bytes)
+        self.runs: Dict[str, _Run] = {}
+        self.tokens = set()
+        self.refresh_tokens = set()
+        self.codes = set()
+        # board name -> end time of the benchmark running on each copy of the board
+        self.slots: Dict[str, List[float]] = {
+            name.lower(): [0.0] * max(1, int(info.get('boardCount', 1)))
+            for name, info in self.config.boards.items()}
+        self.stats = collections.Counter()      # route -> number of requests
+
+    def find_board(self, board: str) -> Optional[str]:
+        return board.lower() if board.lower() in self.slots else None
+
+    def issue_token(self) -> dict:
+        token = _make_token()
+        self.tokens.add(token['access_token'])
+        self.refresh_tokens.add(token['refresh_token'])
+        return token
+
+    def trigger(self, model: str, board: str, args: dict, now: float) -> _Run:
+        run = _Run(f'fake-{uuid.uuid4().hex[:12]}', model, board, args, now)
+        slots = self.slots[board]
+        run.start = max(now, heapq.heappop(slots))
+        t = run.start
+        for state in RUN_STATES:
+            t += self.config.dwell_times.get(state, 0.0)
+            run.state_ends.append(t)
+        heapq.heappush(slots, t)
+        if self.rng.random() < self.config.error_rate:
+            run.error_state = self.rng.choice(RUN_STATES)
+        self.runs[run.benchmark_id] = run
+        return run
+
+    def queued(self, board: str, now: float) -> int:
+        return sum(1 for run in self.runs.values() if run.board == board and run.start > now)
+
+    def get_state(self, run: _Run, now: float) -> str:
+        if now < run.start:
+            return 'in_queue'
+        for state, end in zip(RUN_STATES, run.state_ends):
+            if now < end:
+                return state
+            if state == run.error_state:
+                return 'error'
+        return 'done'
+
+    def get_result(self, run: _Run, now: float) -> dict:
+        state = self.get_state(run, now)
+        reply = {
+            'benchmarkId': run.benchmark_id,
+            'model': run.model,
+            'board': run.board,
+            'args': run.args,
+            'state': state,
+        }
+        if state == 'error':
+            reply['message'] = f'Simulated failure while {STATE_MESSAGES[run.error_state].lower()}'
+        elif state == 'done':
+            if self.config.result_factory is not None:
+                reply.update(self.config.result_factory(dict(reply)))
+            else:
+                duration_ms = round(self.rng.uniform(10, 500), 3)
+                reply.update({
+                    'report': {'rom_size': self.models.get(run.model, 0), 'ram_size': [0], 'rom_n_macc': 0},
+                    'graph': {'exec_time': {'duration_ms': duration_ms, 'cycles': int(duration_ms * 480000),
+                                            'device': run.board}},
+                    'benchmark': {'info': {'graphs': [{'nodes': []}]}},
+                })
+        return reply
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'FakeCloudServer'
+    protocol_version = 'HTTP/1.1'   # keep-alive, as the real backend
+
+    def log_message(self, format, *args):
+        pass
+
+    # replies
+
+    def _send(self, code: int, body=b'', content_type='application/json', headers: dict = None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+
+    def _read_json(self):
+        body = self._read_body()
+        return json.loads(body) if body else {}
+
+    def _read_form(self) -> dict:
+        return {k: v[0] for k, v in parse_qs(self._read_body().decode('utf-8')).items()}
+
+    def _read_uploaded_filename(self) -> Tuple[Optional[str], int]:
+        """ Name and size of the file of a multipart body, read by chunks """
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        head = self.rfile.read(min(length, 1 << 16))
+        remaining = length - len(head)
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1 << 16)))
+        match = re.search(rb'filename="([^"]*)"', head)
+        return (match.group(1).decode('utf-8') if match else None), length
+
+    # dispatch
+
+    def _authorized(self) -> bool:
+        if not self.server.cloud.config.require_auth:
+            return True
+        auth = self.headers.get('Authorization', '')
+        return auth.startswith('Bearer ') and auth[len('Bearer '):] in self.server.cloud.tokens
+
+    def _dispatch(self):
+        cloud = self.server.cloud
+        config = cloud.config
+        path = urlparse(self.path).path.rstrip('/') or '/'
+        if config.response_delay:
+            time.sleep(config.response_delay)
+
+        for method, pattern, handler, protected in self.server.routes:
+            match = re.fullmatch(pattern, path)
+            if method == self.command and match:
+                with cloud.lock:
+                    cloud.stats[f'{method} {pattern}'] += 1
+                if protected:
+                    if not self._authorized():
+                        self._read_body()
+                        return self._send(401, {'error': 'Unauthorized'})
+                    if config.http_error_rate and cloud.rng.random() < config.http_error_rate:
+                        self._read_body()
+                        return self._send(500, {'error': 'Simulated server error'})
+                return handler(self, *match.groups())
+        self._read_body()
+        self._send(404, {'error': f'No route {self.command} {path}'})
+
+    do_GET = do_POST = do_DELETE = _dispatch
+
+    # versions
+
+    def versions(self):
+        self._send(200, self.server.cloud.config.versions)
+
+    # login: SSO form -> redirect to the callback with a code -> code exchanged for a token
+
+    def sso_authorize(self):
+        query = parse_qs(urlparse(self.path).query)
+        redirect_uri = query.get('redirect_uri', [self.server.url + '/callback'])[0]
+        page = ('<html><body>'
+                f'<form method="post" id="login" action="/cas/login?redirect_uri={redirect_uri}">'
+                f'<input type="hidden" name="lt" value="LT-{uuid.uuid4().hex}" />'
+                '</form></body></html>')
+        self._send(200, page.encode('utf-8'), content_type='text/html')
+
+    def sso_login(self):
+        form = self._read_form()
+        redirect_uri = parse_qs(urlparse(self.path).query).get('redirect_uri', [self.server.url + '/callback'])[0]
+        password = self.server.password
+        if password is not None and form.get('password') != password:
+            page = ('You have provided the wrong password. You have 4 attempts left after '
+                    'which your account password will expire.')
+            return self._send(200, page.encode('utf-8'), content_type='text/html')
+        code = uuid.uuid4().hex
+        with self.server.cloud.lock:
+            self.server.cloud.codes.add(code)
+        self._send(302, headers={'Location': f'{redirect_uri}?code={code}'})
+
+    def callback_page(self):
+        self._send(200, b'<html></html>', content_type='text/html')
+
+    def login_callback(self):
+        cloud = self.server.cloud
+        code = self._read_form().get('code')
+        with cloud.lock:
+            if code not in cloud.codes:
+                return self._send(400, {'error': 'invalid code'})
+            cloud.codes.discard(code)
+            token = cloud.issue_token()
+        self._send(200, token)
+
+    def login_refresh(self):
+        cloud = self.server.cloud
+        refresh_token = self._read_form().get('refresh_token')
+        with cloud.lock:
+            if refresh_token not in cloud.refresh_tokens:
+                return self._send(401, {'error': 'invalid refresh token'})
+            cloud.refresh_tokens.discard(refresh_token)
+            token = cloud.issue_token()
+        self._send(200, token)
+
+    # file service
+
+    def list_models(self):
+        with self.server.cloud.lock:
+            models = [{'name': name, 'size': size} for name, size in self.server.cloud.models.items()]
+        self._send(200, models)
+
+    def upload_model(self):
+        filename, size = self._read_uploaded_filename()
+        if not filename:
+            return self._send(400, {'error': 'no file'})
+        with self.server.cloud.lock:
+            self.server.cloud.models[filename] = size
+        self._send(200, {'name': filename})
+
+    def delete_model(self, name):
+        with self.server.cloud.lock:
+            found = self.server.cloud.models.pop(name, None) is not None
+        self._send(200 if found else 404, {'name': name})
+
+    # benchmark service
+
+    def list_boards(self):
+        self._send(200, self.server.cloud.config.boards)
+
+    def trigger(self, board_name):
+        cloud = self.server.cloud
+        data = self._read_json()
+        model = data.get('model')
+        now = time.time()
+        with cloud.lock:
+            board = cloud.find_board(board_name)
+            if board is None:
+                return self._send(400, {'errors': [f'Unknown board {board_name}']})
+            if model not in cloud.models:
+                return self._send(400, {'errors': [f'Model {model} not found']})
+            depth = cloud.config.queue_depth
+            if depth is not None and cloud.queued(board, now) >= depth:
+                return self._send(503, {'errors': [f'Queue of {board_name} is full']})
+            args = {k: v for k, v in data.items() if k != 'model'}
+            run = cloud.trigger(model, board, args, now)
+        self._send(200, {'benchmarkId': run.benchmark_id, 'model': model, 'args': args})
+
+    def list_runs(self):
+        cloud = self.server.cloud
+        now = time.time()
+        with cloud.lock:
+            runs = [{'benchmarkId': run.benchmark_id, 'model': run.model, 'board': run.board,
+                     'state': cloud.get_state(run, now)} for run in cloud.runs.values()]
+        self._send(200, runs)
+
+    def get_run(self, benchmark_id):
+        cloud = self.server.cloud
+        with cloud.lock:
+            run = cloud.runs.get(benchmark_id)
+            reply = None if run is None else cloud.get_result(run, time.time())
+        if reply is None:
+            return self._send(404, {'error': f'Benchmark {benchmark_id} not found'})
+        self._send(200, reply)
+
+    def delete_run(self, benchmark_id):
+        with self.server.cloud.lock:
+            found = self.server.cloud.runs.pop(benchmark_id, None) is not None
+        self._send(200 if found else 404, {'benchmarkId': benchmark_id})
+
+    # fake server only
+
+    def get_stats(self):
+        with self.server.cloud.lock:
+            stats = dict(self.server.cloud.stats)
+        self._send(200, stats)
+
+
+class FakeCloudServer(ThreadingHTTPServer):
+    """
+        HTTP server of a FakeCloud, see environ() for the variables that
+        route stm32_api to it. `password`: only password accepted by the
+        fake SSO (any password if None).
+    """
+    daemon_threads = True
+
+    routes = (
+        # method, path, handler, needs a token
+        ('GET', r'/assets/versions\.json', _Handler.versions, False),
+        ('GET', r'/as/authorization\.oauth2', _Handler.sso_authorize, False),
+        ('POST', r'/cas/login', _Handler.sso_login, False),
+        ('GET', r'/callback', _Handler.callback_page, False),
+        ('POST', r'/api/user_service/login/callback', _Handler.login_callback, False),
+        ('POST', r'/api/user_service/login/refresh', _Handler.login_refresh, False),
+        ('GET', r'/api/file/files/models', _Handler.list_models, True),
+        ('POST', r'/api/file/files/models', _Handler.upload_model, True),
+        ('DELETE', r'/api/file/files/models/([^/]+)', _Handler.delete_model, True),
+        ('GET', r'/api/benchmark/boards', _Handler.list_boards, True),
+        ('GET', r'/api/benchmark/benchmark', _Handler.list_runs, True),
+        ('POST', r'/api/benchmark/benchmark/([^/]+)', _Handler.trigger, True),
+        ('GET', r'/api/benchmark/benchmark/([^/]+)', _Handler.get_run, True),
+        ('DELETE', r'/api/benchmark/benchmark/([^/]+)', _Handler.delete_run, True),
+        ('GET', r'/_fake/stats', _Handler.get_stats, False),
+    )
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: FakeCloudConfig = None, password: str = None):
+        super().__init__((host, port), _Handler)
+        self.cloud = FakeCloud(config)
+        self.password = password
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def environ(self) -> Dict[str, str]:
+        """ Environment variables routing stm32_api to this server """
+        return {
+            BACKEND_EV_NAME.SSO_URL: self.url,
+            BACKEND_EV_NAME.CALLBACK_URL: self.url + '/callback',
+            BACKEND_EV_NAME.USER_SERVICE_URL: self.url + '/api/user_service',
+            BACKEND_EV_NAME.FILE_SERVICE_URL: self.url + '/api/file',
+            BACKEND_EV_NAME.BENCHMARK_SERVICE_URL: self.url + '/api/benchmark',
+            BACKEND_EV_NAME.VERSIONS_URL: self.url + '/assets/versions.json',
+        }
+
+    def issue_token(self) -> str:
+        """ Valid access token, without going through the login """
+        with self.cloud.lock:
+            return self.cloud.issue_token()['access_token']
+
+    def start(self) -> 'FakeCloudServer':
+        """ Serve from a background thread """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'FakeCloudServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the STM32 Cloud backend")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--boards", type=str, nargs="+", default=None,
+                        help="board types as NAME=COUNT (default: %s)" % " ".join(
+                            f"{k}={v['boardCount']}" for k, v in DEFAULT_BOARDS.items()))
+    parser.add_argument("--dwell", type=str, nargs="+", default=[],
+                        help="seconds spent in a state, as STATE=SECONDS (states: %s)" % ", ".join(RUN_STATES))
+    parser.add_argument("--queue-depth", type=int, default=None, help="benchmarks waiting per board type")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability that a benchmark fails")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="probability that a request fails (HTTP 500)")
+    parser.add_argument("--response-delay", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--password", type=str, default=None, help="only password accepted by the login")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    boards = DEFAULT_BOARDS
+    if args.boards:
+        boards = {}
+        for board in args.boards:
+            name, _, count = board.partition("=")
+            boards[name] = {'boardCount': int(count or 1), 'flashSize': '2048', 'deviceCpu': '', 'deviceId': ''}
+    dwell_times = dict(DEFAULT_DWELL_TIMES)
+    for dwell in args.dwell:
+        state, _, seconds = dwell.partition("=")
+        if state not in RUN_STATES:
+            parser.error(f"unknown state {state}")
+        dwell_times[state] = float(seconds)
+
+    config = FakeCloudConfig(
+        boards=boards,
+        dwell_times=dwell_times,
+        queue_depth=args.queue_depth,
+        error_rate=args.error_rate,
+        http_error_rate=args.http_error_rate,
+        response_delay=args.response_delay,
+        seed=args.seed,
+    )
+    server = FakeCloudServer(args.host, args.port, config, password=args.password)
+    print(f"Fake STM32 Cloud listening on {server.url}, route stm32_api to it with:")
+    for name, value in server.environ().items():
+        print(f"export {name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,3 @@
-from .file_manager import FileManager
\ No newline at end of file
+from .file_manager import FileManager
+from .model_cache import CloudModelCache, MODEL_LIST_TTL
+from .upload_manifest import UploadManifest, get_file_digest
\ No newline at end of file
@@ -10,18 +10,28 @@ import os
 
 from datetime import datetime
 from stm32_api.login import LoginManager
-from stm32_api.utils import send_post, send_delete, send_get
+from stm32_api.helper import get_file_service_ep
+from stm32_api.file.model_cache import CloudModelCache
+from stm32_api.file.upload_manifest import UploadManifest, get_file_digest
+from stm32_api.utils import send_post, send_delete, send_get, download_to_file, MultipartFile
 
 
 class FileManager(LoginManager):
     def __init__(self, username: str, password: str):
         super().__init__(username, password)
 
-        self.MODEL_FILE_URL = 'https://stm32ai-cs.st.com/api/file/files/models'
-        self.headers = "'Authorization: Bearer " + self.auth_token + "'" + "Content-type: multipart/form-data"
+        self.MODEL_FILE_URL = get_file_service_ep() + '/files/models'
+        self.model_cache = CloudModelCache()
+        self.upload_manifest = UploadManifest()
 
 
-    def upload_model(self, file_path: str, model_name: str):
+    def upload_model(self, file_path: str, model_name: str, dedup: bool = True):
+        """
+            Upload a model file, returns its name on the cloud (None on failure).
+            With `dedup`, a file whose content was already uploaded (see
+            self.upload_manifest) and is still on the cloud is not sent again:
+            the name it was uploaded with is returned.
+        """
         if file_path is None:
             raise Exception('Please specify the model file path')
         
@@ -29,17 +39,28 @@ class FileManager(LoginManager):
             raise Exception('Please specify the model file name')
 
         try:
-            # with open(file_path, 'rb') as f:
-            #     files = {"file": f}
-            files = {'file': open(file_path, 'rb')}
-            resp = send_post(
-                toUrl = self.MODEL_FILE_URL,
-                withToken = self.auth_token,
-                usingFile = files
-            )
+            # the same bytes are already on the cloud: nothing to send
+            digest = get_file_digest(file_path)
+            cloud_name = self.upload_manifest.get(digest) if dedup else None
+            if cloud_name is not None and self.has_model(cloud_name):
+                print(f'Skipped: the model file({model_name}) is already uploaded as {cloud_name}')
+                return cloud_name
+
+            # streamed from disk, the file is named model_name on the cloud
+            with MultipartFile(file_path, field='file', filename=model_name) as body:
+                resp = send_post(
+                    toUrl = self.MODEL_FILE_URL,
+                    withToken = self.auth_token,
+                    usingData = body,
+                    usingHeaders = {'Content-Type': body.content_type}
+                )
+                resp.close()
 
             if resp.status_code == 200:
+                self.model_cache.add(model_name)
+                self.upload_manifest.record(digest, model_name)
                 print(f'Success: the model file({model_name}) is uploaded')
+                return model_name
             else:
                 print(f'Failed to upload the model file ({model_name})')
                 print(resp.text)
@@ -57,6 +78,8 @@ class FileManager(LoginManager):
             )
 
             if resp.status_code == 200:
+                self.model_cache.discard(model_name)
+                self.upload_manifest.forget(model_name)
                 print(f'Success: the model file({model_name}) is deleted')
             else:
                 print(f'Failed to delete model file {model_name}')
@@ -71,6 +94,7 @@ class FileManager(LoginManager):
         resp.close()
 
         if isinstance(json_resp, list):
+            self.model_cache.set(model['name'] for model in json_resp if 'name' in model)
             return json_resp
         else:
             return None
@@ -87,13 +111,36 @@ class FileManager(LoginManager):
         try:
             if not os.path.exists(path):
                 os.makedirs(path)
-            # curl을 이용해서 현재 스토리지에 있는 모델 리스트 응답을 받고 json 저장
-            curl_command = "curl -X 'GET' " + "'" + self.MODEL_FILE_URL \
-                + "' " + "-H 'accept: application/json' " \
-                + "-H " + self.headers \
-                + "'" + " | jq '.' > " + path + stamp + ".json"
-            os.system(curl_command)
-
-            print(f'Cloud model list is saved in {path}/{stamp}.json')
+            # 현재 스토리지에 있는 모델 리스트 응답을 받고 json 저장
+            list_path = download_to_file(
+                self.MODEL_FILE_URL,
+                self.auth_token,
+                os.path.join(path, stamp + ".json"))
+
+            print(f'Cloud model list is saved in {list_path}')
+            return list_path
         except Exception as e:
             print(e)
+
+
+    def get_cloud_models(self, refresh: bool = False) -> set:
+        """
+            Names of the models on the cloud. The last listing is reused
+            until it expires (see self.model_cache.ttl) unless `refresh` is set.
+        """
+        names = None if refresh else self.model_cache.get()
+        if names is None:
+            models = self.upload_model_list() or []
+            names = {model['name'] for model in models if 'name' in model}
+        return names
+
+
+    def has_model(self, model_name: str) -> bool:
+        """
+            Check that a model is on the cloud. A name missing from the cached
+            listing is checked again against a fresh one before giving up.
+        """
+        names = self.model_cache.get()
+        if names is not None and model_name in names:
+            return True
+        return model_name in self.get_cloud_models(refresh=True)
@@ -0,0 +1,57 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import time
+import threading
+
+from typing import Iterable, Optional, Set
+
+# seconds a listing of the cloud storage is trusted before it is fetched again
+MODEL_LIST_TTL = 60
+
+
+class CloudModelCache:
+    """
+        Names of the models in the cloud storage, as of the last listing.
+
+        The listing expires after `ttl` seconds. In between, uploads and
+        deletions done by this process are applied locally, so checking that
+        a model exists does not cost a full listing per benchmark.
+    """
+    def __init__(self, ttl: float = MODEL_LIST_TTL):
+        self.ttl = ttl
+        self._names: Optional[Set[str]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self._names is not None and (time.monotonic() - self._fetched_at) <= self.ttl
+
+    def get(self) -> Optional[Set[str]]:
+        """ Cached names, None when they must be listed again """
+        with self._lock:
+            return set(self._names) if self.is_fresh() else None
+
+    def set(self, names: Iterable[str]):
+        with self._lock:
+            self._names = set(names)
+            self._fetched_at = time.monotonic()
+
+    def add(self, name: str):
+        with self._lock:
+            if self._names is not None:
+                self._names.add(name)
+
+    def discard(self, name: str):
+        with self._lock:
+            if self._names is not None:
+                self._names.discard(name)
+
+    def invalidate(self):
+        with self._lock:
+            self._names = None
@@ -0,0 +1,80 @@
+# /*---------------------------------------------------------------------------------------------
+#  * Copyright (c) 2023 STMicroelectronics. All rights reserved.
+#  * This software is licensed under terms that can be found in the LICENSE
+#  * file in the root directory of this software component.
+#  * If no LICENSE file comes with this software, it is provided AS-IS.
+#  *--------------------------------------------------------------------------------------------*/
+
+
+import os
+import json
+import hashlib
+import threading
+
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+MANIFEST_FILE = '.stmai_upload_manifest.json'
+
+
+def get_file_digest(file_path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """ sha256 of a file, read chunk by chunk """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class UploadManifest:
+    """
+        Local record of the files uploaded to the cloud storage:
+        content hash (sha256) -> cloud model name.
+
+        It is kept in a json file (~/.stmai_upload_manifest.json by default)
+        so that a file whose bytes are already on the cloud is not uploaded
+        again, even by another run.
+    """
+    def __init__(self, path: Union[str, Path] = None):
+        self.path = Path.joinpath(Path.home(), MANIFEST_FILE) if path is None else Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, str] = self._read()
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:     # the manifest is an optimization, uploads go on without it
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            return self._entries.get(digest)
+
+    def record(self, digest: str, model_name: str):
+        with self._lock:
+            # other runs may have written the file meanwhile
+            self._entries.update(self._read())
+            # the cloud file was overwritten: its old content is gone
+            for old_digest in [d for d, name in self._entries.items() if name == model_name]:
+                del self._entries[old_digest]
+            self._entries[digest] = model_name
+            self._write()
+
+    def forget(self, model_name: str):
+        with self._lock:
+            self._entries.update(self._read())
+            for digest in [d for d, name in self._entries.items() if name == model_name]:
+                del self._entries[digest]
+            self._write()
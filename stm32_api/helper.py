@@ -6,10 +6,19 @@
 #  *--------------------------------------------------------------------------------------------*/
 
 import os
-import requests
+import json
+import time
+import logging
+import threading
 
-from stm32_api.utils.http_requests import get_ssl_verify_status, get_env_proxy
+from pathlib import Path
+
+from stm32_api.utils.http_requests import get_ssl_verify_status, get_env_proxy, get_session
 from stm32_api.utils.endpoints import BACKEND_EV_NAME, BACKEND_ENDPOINTS, BACKEND_TEST_ENDPOINTS
+from stm32_api.utils.types import LOGGER_NAME
+from stm32_api.utils.errors import ServerError
+
+logger = logging.getLogger(LOGGER_NAME)
 
 USE_TEST_ROUTES_EV = 'USE_TEST_ROUTES'
 
@@ -72,6 +81,24 @@ def get_login_authenticate_ep():
     """
     return get_login_service_ep() + '/authenticate'
 
+def get_login_refresh_ep():
+    """
+    Route on which a refresh token is exchanged for a new access token (POST)
+    """
+    return get_login_service_ep() + '/login/refresh'
+
+def get_file_service_ep():
+    """
+    Main route to access file service (model storage)
+    """
+    if os.environ.get(BACKEND_EV_NAME.FILE_SERVICE_URL):
+        return os.environ.get(BACKEND_EV_NAME.FILE_SERVICE_URL)
+
+    if os.environ.get(USE_TEST_ROUTES_EV):
+        return BACKEND_TEST_ENDPOINTS.FILE_SERVICE_URL
+    else:
+        return BACKEND_ENDPOINTS.FILE_SERVICE_URL
+
 def get_benchmark_service_ep():
     """
     Main route to access benchmark service
@@ -86,9 +113,80 @@ def get_benchmark_service_ep():
 
 ####################################################################################################
 
-def get_supported_versions(toUrl: str=None):
-    resp = requests.get(
-        get_supported_versions_ep(),
-        verify=get_ssl_verify_status(),
-        proxies=get_env_proxy())
-    return resp.json()
\ No newline at end of file
+# versions.json changes with releases only: it is fetched at most once per TTL,
+# the copy is shared by every service of the process and kept on disk for the next runs
+VERSIONS_CACHE_TTL = 3600
+VERSIONS_CACHE_MAX_AGE = 7 * 24 * 3600     # copies of the file not refreshed for this long are dropped
+VERSIONS_CACHE_FILE = '.stmai_versions.json'
+_versions_cache = {}    # url -> (fetch time, versions)
+_versions_lock = threading.Lock()
+
+
+def _read_versions_cache_file() -> dict:
+    try:
+        with open(Path.joinpath(Path.home(), VERSIONS_CACHE_FILE), 'r') as f:
+            entries = json.load(f)
+        return entries if isinstance(entries, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _is_versions_entry_expired(entry, now: float) -> bool:
+    try:
+        return not 0 <= now - float(entry['fetched_at']) < VERSIONS_CACHE_MAX_AGE
+    except (TypeError, KeyError, ValueError):
+        return True
+
+
+def _write_versions_cache_file(url: str, fetched_at: float, versions):
+    path = Path.joinpath(Path.home(), VERSIONS_CACHE_FILE)
+    # entries of the other urls are kept until they expire
+    entries = {k: v for k, v in _read_versions_cache_file().items()
+               if not _is_versions_entry_expired(v, fetched_at)}
+    entries[url] = {'fetched_at': fetched_at, 'versions': versions}
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_supported_versions(toUrl: str=None, ttl: float=VERSIONS_CACHE_TTL, refresh: bool=False):
+    """
+    Supported versions on Dev. Cloud (versions.json).
+    The reply is cached `ttl` seconds in memory and on disk (~/.stmai_versions.json).
+    If the server cannot be reached, the last copy is used even if it is older.
+    Copies of other urls not refreshed for VERSIONS_CACHE_MAX_AGE are dropped from the file.
+    """
+    url = toUrl or get_supported_versions_ep()
+    with _versions_lock:
+        now = time.time()
+        cached = _versions_cache.get(url)
+        if cached is None:
+            entry = _read_versions_cache_file().get(url)
+            if isinstance(entry, dict) and 'versions' in entry:
+                cached = (float(entry.get('fetched_at', 0)), entry['versions'])
+                _versions_cache[url] = cached
+        if cached is not None and not refresh and 0 <= now - cached[0] < ttl:
+            return cached[1]
+
+        try:
+            resp = get_session().get(
+                url,
+                verify=get_ssl_verify_status(),
+                proxies=get_env_proxy())
+            if resp.status_code != 200:
+                raise ServerError(f'GET {url} failed with HTTP code {resp.status_code}')
+            versions = resp.json()
+        except Exception as e:
+            if cached is None:
+                raise
+            logger.warning(f'Cannot fetch {url} ({e}), using the copy from {time.ctime(cached[0])}')
+            return cached[1]
+
+        _versions_cache[url] = (now, versions)
+        _write_versions_cache_file(url, now, versions)
+        return versions
\ No newline at end of file
@@ -15,10 +15,13 @@ class LoginManager:
         self.login_service = LoginService()
 
         if username is None or password is None:
-            raise LoginFailureException(
-                username,
-                password,
-                details='Empty login or stored token invalid.')
+            # no credentials: reuse (or refresh) the token saved by a previous login
+            self.auth_token = self.login_service.get_stored_token(username)
+            if self.auth_token is None:
+                raise LoginFailureException(
+                    username,
+                    password,
+                    details='Empty login or stored token invalid.')
         else:
             self.auth_token = self.login_service.login(username=username, password=password)
 
@@ -5,7 +5,7 @@
 #  * If no LICENSE file comes with this software, it is provided AS-IS.
 #  *--------------------------------------------------------------------------------------------*/
 
-from json import JSONDecodeError, dump, load
+from json import JSONDecodeError, dump, load, loads
 import requests
 from typing import Union
 import html
@@ -14,41 +14,236 @@ from urllib.parse import urlparse, parse_qs, urljoin
 import os
 import sys
 import time
+import base64
+import binascii
+import hashlib
+import contextlib
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:     # Windows: the token file is not locked
+    fcntl = None
+
 from stm32_api.helper import *
+from stm32_api.utils.endpoints import BACKEND_ENDPOINTS
+from stm32_api.utils.errors import InvalidCrendetialsException, BlockedAccountException, LoginFailureException
+
+# a token is renewed this many seconds before it expires
+TOKEN_EXPIRY_MARGIN = 60
+# lifetime assumed for tokens that tell neither 'exp' nor 'expires_in'
+DEFAULT_TOKEN_TTL = 3600
+# PBKDF2 iterations of the credentials digest saved with a token
+CREDENTIALS_DIGEST_ITERATIONS = 100000
+
+
+def get_token_file_name(main_route: str, sso_url: str) -> str:
+    """
+    Token files are kept per service (login route + SSO), so that a token of
+    the QA backend or of a fake cloud is never sent to another one.
+    The production service keeps the historical '.stmai_token'.
+    """
+    if main_route == BACKEND_ENDPOINTS.USER_SERVICE_URL and sso_url == BACKEND_ENDPOINTS.SSO_URL:
+        return '.stmai_token'
+    service_id = hashlib.sha256(f'{main_route}|{sso_url}'.encode('utf-8')).hexdigest()[:12]
+    return f'.stmai_token-{service_id}'
+
+
+def get_credentials_digest(username: str, password: str, salt: bytes) -> str:
+    return hashlib.pbkdf2_hmac(
+        'sha256', f'{username}:{password}'.encode('utf-8'), salt, CREDENTIALS_DIGEST_ITERATIONS).hex()
+
+
+def get_token_expiry(token: dict) -> Union[float, None]:
+    """
+    Expiry time (epoch seconds) of a stored token response: the 'exp' claim
+    of the access token (JWT), else 'expires_in' counted from when it was saved.
+    """
+    access_token = token.get('access_token') or ''
+    parts = access_token.split('.')
+    if len(parts) == 3:
+        try:
+            payload = parts[1] + '=' * (-len(parts[1]) % 4)
+            exp = loads(base64.urlsafe_b64decode(payload)).get('exp')
+            if exp is not None:
+                return float(exp)
+        except (ValueError, binascii.Error, AttributeError):
+            pass
+
+    saved_at = token.get('saved_at')
+    if saved_at is None:
+        return None
+    return float(saved_at) + float(token.get('expires_in', DEFAULT_TOKEN_TTL))
+
 
 class LoginService:
     def __init__(self) -> None:
-        self.token_file = Path.joinpath(Path.home(), '.stmai_token')
         self.main_route = get_login_service_ep()
+        self.sso_url = get_sso_url_ep()
+
+        token_file_name = get_token_file_name(self.main_route, self.sso_url)
+        self.token_file = Path.joinpath(Path.home(), token_file_name)
+        self.lock_file = Path.joinpath(Path.home(), f'{token_file_name}.lock')
 
         self.authenticate_route = get_login_authenticate_ep()
+        self.refresh_route = get_login_refresh_ep()
         self.auth_token = None
 
     def read_token_from_storage(self) -> Union[dict, None]:
-        if (os.path.exists(self.token_file) == False):
+        try:
+            with open(self.token_file, 'r') as f:
+                token = load(f)
+        except (OSError, ValueError):
             return None
-        f = open(self.token_file, 'r')
-        token = load(f)
-        return token
+        return token if isinstance(token, dict) else None
     
-    def save_token_response(self, token) -> bool:
-        with open(self.token_file, 'w') as f:
-            dump(token, f)
+    def save_token_response(self, token, username=None, password=None, credentials=None) -> bool:
+        """
+        Save a token response with the service that issued it and, when the
+        password is known, a salted digest of the credentials (see is_token_owner()).
+        `credentials` carries the digest of a token over when it is refreshed.
+        """
+        token = dict(token)
+        token['saved_at'] = time.time()
+        token['service'] = self.main_route
+        token['sso_url'] = self.sso_url
+        if username is not None:
+            token['username'] = username
+        if password is not None and username is not None:
+            salt = os.urandom(16)
+            credentials = {'salt': salt.hex(), 'digest': get_credentials_digest(username, password, salt)}
+        if credentials is not None:
+            token['credentials'] = credentials
+
+        # written aside then renamed: readers never see a half-written file
+        tmp_path = f'{self.token_file}.{os.getpid()}.tmp'
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                dump(token, f)
+            os.replace(tmp_path, self.token_file)
+            return True
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
 
-    def login(self, username, password) -> str:
-        for i in range(5):
+    @contextlib.contextmanager
+    def _token_lock(self):
+        """ Only one process at a time logs in or refreshes the stored token """
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_file, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
             try:
-                self._login(username, password)
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def is_token_owner(self, token: Union[dict, None], username=None, password=None) -> bool:
+        """
+        `token` was issued by this service, to `username` (if given), logged
+        in with `password` (if given). Tokens saved without these are rejected.
+        """
+        if not token:
+            return False
+        if token.get('service') != self.main_route or token.get('sso_url') != self.sso_url:
+            return False
+        if username is not None and token.get('username') not in (None, username):
+            return False
+        if password is not None:
+            credentials = token.get('credentials')
+            if not isinstance(credentials, dict) or username is None:
+                return False
+            try:
+                salt = bytes.fromhex(credentials.get('salt', ''))
+            except ValueError:
+                return False
+            if get_credentials_digest(username, password, salt) != credentials.get('digest'):
+                return False
+        return True
+
+    def is_token_valid(self, token: Union[dict, None], username=None, password=None) -> bool:
+        if not token or not token.get('access_token'):
+            return False
+        if not self.is_token_owner(token, username, password):
+            return False
+        expiry = get_token_expiry(token)
+        return expiry is not None and time.time() < expiry - TOKEN_EXPIRY_MARGIN
+
+    def refresh_token(self, token: dict, username=None) -> Union[str, None]:
+        """ Exchange the refresh token of `token` for a new access token """
+        refresh_token = token.get('refresh_token')
+        if not refresh_token:
+            return None
+        try:
+            resp = get_session().post(
+                self.refresh_route,
+                data={"refresh_token": refresh_token},
+                verify=get_ssl_verify_status(),
+                proxies=get_env_proxy())
+            json_resp = resp.json() if resp.status_code == 200 else None
+        except (requests.RequestException, ValueError):
+            return None
+
+        if not isinstance(json_resp, dict) or not json_resp.get('access_token'):
+            return None
+        if not json_resp.get('refresh_token'):
+            json_resp['refresh_token'] = refresh_token
+        self.save_token_response(json_resp, username or token.get('username'), credentials=token.get('credentials'))
+        self.auth_token = json_resp['access_token']
+        return self.auth_token
+
+    def get_stored_token(self, username=None, refresh=True, password=None) -> Union[str, None]:
+        """
+        Access token saved by a previous login of this service, None if there
+        is no valid one. With a `password`, the token must come from a login
+        with the same credentials.
+        An expired token is refreshed when it comes with a refresh token.
+        """
+        token = self.read_token_from_storage()
+        if self.is_token_valid(token, username, password):
+            self.auth_token = token['access_token']
+            return self.auth_token
+        if not refresh or token is None:
+            return None
+
+        with self._token_lock():
+            # another process may have renewed it while we waited for the lock
+            token = self.read_token_from_storage()
+            if self.is_token_valid(token, username, password):
+                self.auth_token = token['access_token']
                 return self.auth_token
-            except InvalidCrendetialsException as e:
-                raise e
-            except BlockedAccountException as e:
-                raise e
-            except Exception as e:
-                print('Login issue, retry (' + str(i+1) + '/5)')
-                time.sleep(5)
+            if self.is_token_owner(token, username, password):
+                return self.refresh_token(token, username)
+        return None
+
+    def login(self, username, password, use_stored=True) -> str:
+        if use_stored:
+            auth_token = self.get_stored_token(username, password=password)
+            if auth_token is not None:
+                return auth_token
+
+        with self._token_lock():
+            # a worker that waited for the lock reuses the token of the one that logged in
+            if use_stored:
+                token = self.read_token_from_storage()
+                if self.is_token_valid(token, username, password):
+                    self.auth_token = token['access_token']
+                    return self.auth_token
+
+            for i in range(5):
+                try:
+                    self._login(username, password)
+                    return self.auth_token
+                except InvalidCrendetialsException as e:
+                    raise e
+                except BlockedAccountException as e:
+                    raise e
+                except Exception as e:
+                    print('Login issue, retry (' + str(i+1) + '/5)')
+                    time.sleep(5)
 
     def _login(self, username, password) -> str:
         # Starts a requests sesson
@@ -140,7 +335,7 @@ class LoginService:
         # Get tokens with POST endpoint
 
         resp = s.post(
-            url='https://stm32ai-cs.st.com/api/user_service/login/callback',
+            url=self.main_route + '/login/callback',
             data={
                 "redirect_url": redirect_uri,
                 "code": auth_code
@@ -158,12 +353,12 @@ class LoginService:
             json_resp = resp.json()
             if json_resp['access_token']:
                 # Connection has correctly been done, continue
-                self.save_token_response(json_resp)
+                self.save_token_response(json_resp, username, password)
                 self.auth_token = json_resp['access_token']
                 return self.auth_token
             else:
                 raise LoginFailureException(
-                    self.username, self.password, details=f"Authentication server did not succeed: {resp}")
+                    username, password, details=f"Authentication server did not succeed: {resp}")
         except JSONDecodeError as e:
             raise LoginFailureException(
-                self.username, self.password, 'Error while decoding server reply')
+                username, password, 'Error while decoding server reply')
@@ -6,11 +6,33 @@
 #  *--------------------------------------------------------------------------------------------*/
 
 import requests
+import gzip
+import io
 import os
+import uuid
+import threading
+import weakref
 import urllib3
 
+from requests.adapters import HTTPAdapter
 from requests.structures import CaseInsensitiveDict
 
+from stm32_api.utils.errors import ServerError, ServerRouteNotFound
+
+# Each thread keeps one session for all its requests, so that connections
+# (TCP + TLS) are kept alive and reused, e.g. while polling benchmarks.
+# requests.Session is not thread-safe, threads do not share a session.
+_local = threading.local()
+_sessions = weakref.WeakSet()   # sessions of every thread, closed by configure_session()
+_generation = 0                 # sessions of an older generation are replaced
+_session_lock = threading.Lock()
+_session_config = {
+    "pool_connections": 10,     # number of hosts with a cached connection pool
+    "pool_maxsize": 32,         # connections kept alive per host
+    "pool_block": False,        # if True, never open more than pool_maxsize connections per host
+    "max_retries": 0,
+}
+
 def get_env_proxy():
     proxy_config = {}
     http_proxy = "http://user:passwd@ip_address:port"
@@ -32,17 +54,105 @@ def get_ssl_verify_status():
         return True
 
 
+def configure_session(
+        pool_connections: int = None,
+        pool_maxsize: int = None,
+        pool_block: bool = None,
+        max_retries: int = None) -> None:
+    """
+    Change the connection pool limits of the sessions.
+    The current sessions are closed, the next request of each thread creates a new one.
+    """
+    global _generation
+    with _session_lock:
+        for name, value in (("pool_connections", pool_connections),
+                            ("pool_maxsize", pool_maxsize),
+                            ("pool_block", pool_block),
+                            ("max_retries", max_retries)):
+            if value is not None:
+                _session_config[name] = value
+        _generation += 1
+        for session in list(_sessions):
+            session.close()
+        _sessions.clear()
+
+
+def get_session() -> requests.Session:
+    """
+    Session of the calling thread, with keep-alive connection pooling
+    """
+    session = getattr(_local, "session", None)
+    if session is None or _local.generation != _generation:
+        with _session_lock:
+            session = requests.Session()
+            adapter = HTTPAdapter(**_session_config)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions.add(session)
+            _local.session, _local.generation = session, _generation
+    return session
+
+
+class MultipartFile(io.RawIOBase):
+    """
+    multipart/form-data body holding one file, read from disk as it is sent.
+    requests reads the whole file in memory when it is given with `files=`,
+    this body is given with `data=` instead: its length is known upfront, so
+    it is sent with a Content-Length, chunk by chunk.
+    """
+    def __init__(self, file_path: str, field: str = "file", filename: str = None):
+        super().__init__()
+        boundary = uuid.uuid4().hex
+        filename = os.path.basename(file_path) if filename is None else filename
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = (f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n').encode("utf-8")
+        tail = f'\r\n--{boundary}--\r\n'.encode("utf-8")
+        self._file = open(file_path, "rb")
+        self._parts = [io.BytesIO(head), self._file, io.BytesIO(tail)]
+        self._length = len(head) + os.fstat(self._file.fileno()).st_size + len(tail)
+        self._position = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def tell(self) -> int:
+        # requests sends len() - tell() as Content-Length
+        return self._position
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._parts:
+            n = self._parts[0].readinto(buffer)
+            if n:
+                self._position += n
+                return n
+            self._parts.pop(0)
+        return 0
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
 def send_post(
         toUrl: str,
         withToken: str,
         usingData: dict = None,
         usingFile: dict = None,
-        usingJson=None) -> requests.Response:
+        usingJson=None,
+        usingHeaders: dict = None) -> requests.Response:
     headers = CaseInsensitiveDict()
     headers["Accept"] = "application/json"
     headers["Authorization"] = f"Bearer {withToken}"
+    if usingHeaders:
+        headers.update(usingHeaders)
 
-    resp = requests.post(
+    resp = get_session().post(
         toUrl,
         headers=headers,
         verify=get_ssl_verify_status(),
@@ -58,7 +168,7 @@ def send_delete(toUrl: str, withToken: str) -> requests.Response:
     headers["Accept"] = "application/json"
     headers["Authorization"] = f"Bearer {withToken}"
 
-    resp = requests.delete(
+    resp = get_session().delete(
         toUrl,
         headers=headers,
         verify=get_ssl_verify_status(),
@@ -69,18 +179,54 @@ def send_delete(toUrl: str, withToken: str) -> requests.Response:
 def send_get(
         toUrl: str,
         withToken: str,
-        usingParams: dict = None) -> requests.Response:
+        usingParams: dict = None,
+        stream: bool = False) -> requests.Response:
     headers = CaseInsensitiveDict()
     headers["Accept"] = "application/json"
     headers["Authorization"] = f"Bearer {withToken}"
 
-    resp = requests.get(
+    resp = get_session().get(
         toUrl,
         headers=headers,
         verify=get_ssl_verify_status(),
         params=usingParams,
+        stream=stream,
         proxies=get_env_proxy())
 
     if resp.status_code == 404:
-        raise print(f"ServerRouteNotFound: Trying to reach: {toUrl}")
-    return resp
\ No newline at end of file
+        resp.close()
+        raise ServerRouteNotFound(f"Trying to reach: {toUrl}")
+    return resp
+
+
+def download_to_file(
+        toUrl: str,
+        withToken: str,
+        path: str,
+        usingParams: dict = None,
+        compress: bool = False,
+        chunk_size: int = 1 << 16) -> str:
+    """
+    Stream the body of a GET request to `path`, chunk by chunk.
+    The body is written to a temporary file that is renamed once complete, so
+    `path` is never left half-written. With compress=True the file is gzip
+    compressed and '.gz' is appended to `path`.
+    Returns the written path.
+    """
+    if compress:
+        path = path + '.gz'
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+
+    with send_get(toUrl, withToken, usingParams, stream=True) as resp:
+        if resp.status_code != 200:
+            raise ServerError(f"GET {toUrl} failed with HTTP code {resp.status_code}: {resp.text[:200]}")
+        try:
+            with (gzip.open(tmp_path, 'wb') if compress else open(tmp_path, 'wb')) as f:
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return path
\ No newline at end of file
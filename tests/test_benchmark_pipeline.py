@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from stm32_api.fake_cloud import FakeCloudServer, FakeCloudConfig, DEFAULT_DWELL_TIMES
+from stm32_api.file import FileManager
+from stm32_api.benchmark import BenchmarkManager, BenchmarkPipeline, BenchmarkJob
+from stm32_api.utils import ServerError
+
+BOARDS = ('STM32F769I-DISCO', 'STM32H747I-DISCO')
+
+
+@pytest.fixture
+def cloud(tmp_path, monkeypatch):
+    # token, upload manifest and versions cache files go to a fresh home
+    monkeypatch.setenv('HOME', str(tmp_path))
+    config = FakeCloudConfig(dwell_times={state: 0.02 for state in DEFAULT_DWELL_TIMES}, seed=0)
+    server = FakeCloudServer(config=config, password='password').start()
+    for name, value in server.environ().items():
+        monkeypatch.setenv(name, value)
+    yield server
+    server.stop()
+
+
+def get_pipeline(tmp_path, **kwargs) -> BenchmarkPipeline:
+    file_manager = FileManager('user', 'password')
+    benchmark_manager = BenchmarkManager(None, file_manager, str(tmp_path / 'out'), stm_version='9.1.0')
+    return BenchmarkPipeline(benchmark_manager, {}, timeout=30, pooling_delay=0.02, **kwargs)
+
+
+def write_model(path, content: bytes) -> str:
+    with open(path, 'wb') as f:
+        f.write(content)
+    return str(path)
+
+
+def test_identical_files_share_the_cloud_model(cloud, tmp_path):
+    content = os.urandom(1000)
+    path_a = write_model(tmp_path / 'a.tflite', content)
+    path_b = write_model(tmp_path / 'b.tflite', content)
+    jobs = [
+        BenchmarkJob('a.tflite', path_a, BOARDS[0], str(tmp_path / BOARDS[0] / 'a.json')),
+        # one board of this type at once: the second job of b starts after a is over
+        BenchmarkJob('b.tflite', path_b, BOARDS[1], str(tmp_path / BOARDS[1] / 'b.json')),
+        BenchmarkJob('b.tflite', path_b, BOARDS[1], str(tmp_path / BOARDS[1] / 'b2.json')),
+    ]
+    pipeline = get_pipeline(tmp_path, board_limits={BOARDS[0]: 1, BOARDS[1]: 1})
+
+    outcomes = [outcome for _, outcome in pipeline.run(jobs)]
+
+    assert all(isinstance(outcome, str) for outcome in outcomes), outcomes
+    assert cloud.cloud.stats['POST /api/file/files/models'] == 1
+    assert cloud.cloud.stats['DELETE /api/file/files/models/([^/]+)'] == 1
+    assert not cloud.cloud.models
+
+
+def test_failed_upload_fails_the_job(cloud, tmp_path, monkeypatch):
+    path = write_model(tmp_path / 'a.tflite', os.urandom(1000))
+    job = BenchmarkJob('a.tflite', path, BOARDS[0], str(tmp_path / 'a.json'))
+    pipeline = get_pipeline(tmp_path)
+    # FileManager.upload_model() reports its failures by returning None
+    monkeypatch.setattr(pipeline.file_manager, 'upload_model', lambda file_path, model_name: None)
+
+    [(_, outcome)] = pipeline.run([job])
+
+    assert isinstance(outcome, ServerError)
+    assert not cloud.cloud.runs
+    assert cloud.cloud.stats['DELETE /api/file/files/models/([^/]+)'] == 0
@@ -0,0 +1,43 @@
+import struct
+
+import pytest
+
+from latency_lookup_table.binary_table import HEADER, load_binary_table, save_binary_table
+
+LOOKUP_TABLE = {
+    "Conv-input:160x160x3-output:80x80x32-stride:2": {"count": 3, "mean": 1.5, "std": 0.25, "min": 1.25, "max": 1.75},
+    "Logits-input:5x5x1280-output:1000": {"count": 1, "mean": 0.125, "std": 0, "min": 0.125, "max": 0.125},
+}
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    path = str(tmp_path / "final_lookup_table.bin")
+    save_binary_table(LOOKUP_TABLE, path)
+    return path
+
+
+def test_round_trip(table_path):
+    table = load_binary_table(table_path)
+
+    assert table.keys == list(LOOKUP_TABLE)
+    assert table.to_dict() == LOOKUP_TABLE
+
+
+def test_columns_are_little_endian(table_path):
+    with open(table_path, "rb") as f:
+        data = f.read()
+    _, _, n_keys, n_fields, names_nbytes = HEADER.unpack_from(data, 0)
+    data_offset = (HEADER.size + names_nbytes + 7) // 8 * 8
+
+    # first column: count
+    assert struct.unpack_from(f"<{n_keys}d", data, data_offset) == (3.0, 1.0)
+
+
+def test_as_numpy(table_path):
+    np = pytest.importorskip("numpy")
+    table = load_binary_table(table_path)
+
+    mean = table.as_numpy("mean")
+    assert mean.dtype == np.dtype("<f8")
+    assert mean.tolist() == [1.5, 0.125]
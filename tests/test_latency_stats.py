@@ -0,0 +1,51 @@
+import random
+import statistics
+
+import pytest
+
+from latency_lookup_table.helper import accumulate_stats, merge_stats, get_final_table
+
+
+def get_model_tables(n_models: int, seed: int = 0):
+    rng = random.Random(seed)
+    layers = [f"layer{idx}" for idx in range(8)]
+    # each model has some of the layers, with latencies of different scales
+    return [{layer: rng.lognormvariate(idx, 0.3) for idx, layer in enumerate(layers) if rng.random() < 0.7}
+            for _ in range(n_models)]
+
+
+@pytest.mark.parametrize("shard_size", [1, 7, 64, 1000])
+def test_merged_shards_match_the_full_set(shard_size):
+    tables = get_model_tables(300)
+
+    expected = get_final_table(accumulate_stats(tables))
+    stats = {}
+    for start in range(0, len(tables), shard_size):
+        merge_stats(stats, accumulate_stats(tables[start:start + shard_size]))
+    merged = get_final_table(stats)
+
+    assert merged.keys() == expected.keys()
+    for layer, layer_stats in expected.items():
+        assert merged[layer]["count"] == layer_stats["count"]
+        assert merged[layer]["min"] == layer_stats["min"]
+        assert merged[layer]["max"] == layer_stats["max"]
+        assert merged[layer]["mean"] == pytest.approx(layer_stats["mean"], rel=1e-12)
+        assert merged[layer]["std"] == pytest.approx(layer_stats["std"], rel=1e-9)
+
+
+def test_stats_match_statistics_module():
+    tables = get_model_tables(50)
+    final_table = get_final_table(accumulate_stats(tables))
+
+    for layer, layer_stats in final_table.items():
+        samples = [table[layer] for table in tables if layer in table]
+        assert layer_stats["mean"] == pytest.approx(statistics.mean(samples), rel=1e-12)
+        assert layer_stats["std"] == pytest.approx(statistics.stdev(samples), rel=1e-9)
+
+
+def test_merge_with_empty_shards():
+    tables = get_model_tables(10)
+    stats = merge_stats(merge_stats({}, {}), accumulate_stats(tables))
+    merge_stats(stats, {})
+
+    assert get_final_table(stats) == get_final_table(accumulate_stats(tables))
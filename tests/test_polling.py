@@ -0,0 +1,45 @@
+import pytest
+
+from stm32_api.fake_cloud import FakeCloudServer, FakeCloudConfig, DEFAULT_DWELL_TIMES
+from stm32_api.file import FileManager
+from stm32_api.benchmark import BenchmarkManager
+from stm32_api.benchmark.polling import PollingPolicy
+from stm32_api.utils import CliParameters, ServerRouteNotFound
+
+BOARD = 'STM32H747I-DISCO'
+
+
+@pytest.fixture
+def benchmark_service(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    config = FakeCloudConfig(dwell_times={state: 0.02 for state in DEFAULT_DWELL_TIMES}, seed=0)
+    server = FakeCloudServer(config=config, password='password').start()
+    for name, value in server.environ().items():
+        monkeypatch.setenv(name, value)
+    file_manager = FileManager('user', 'password')
+    yield BenchmarkManager(None, file_manager, str(tmp_path / 'out'), stm_version='9.1.0').benchmark_service
+    server.stop()
+
+
+def trigger(benchmark_service, tmp_path) -> str:
+    path = tmp_path / 'a.tflite'
+    path.write_bytes(b'model')
+    cloud_name = benchmark_service.file_manager.upload_model(str(path), 'a.tflite')
+    return benchmark_service.trigger_benchmark(CliParameters(model=cloud_name), BOARD, '9.1.0')
+
+
+def test_unknown_benchmark_fails_at_once(benchmark_service):
+    [completion] = benchmark_service.poll_many(['does-not-exist'], timeout=30, policy=PollingPolicy.fixed(0.02))
+
+    assert completion.state == 'failed'
+    assert isinstance(completion.error, ServerRouteNotFound)
+
+
+def test_unauthorized_poll_is_retried(benchmark_service, tmp_path):
+    benchmark_id = trigger(benchmark_service, tmp_path)
+    # e.g. the token expires in the middle of a campaign
+    benchmark_service.auth_token = 'expired'
+
+    [completion] = benchmark_service.poll_many([benchmark_id], timeout=0.3, policy=PollingPolicy.fixed(0.02))
+
+    assert completion.state == 'timeout'